@@ -1,244 +1,608 @@
-'''Agents for moving through boards'''
+'''Agents for moving through boards
+
+Every agent takes an optional probe (see Instrument.py) that is told when each phase of a step ends, and an optional
+checkpoint (see Checkpoint.py) that saves the run every few steps and resumes it when restarted.
+'''
 
 import numpy as np
 
 from Board import Board, FLAT, HILL, FOREST, CAVE, FOUND, MISSING
+from Checkpoint import NO_CHECKPOINT
+from Instrument import NULL_PROBE
+from Team import assignNearest
 
 
-def rule1(board: Board, moving_target=False) -> int:
+def rule1(board: Board, moving_target=False, probe=NULL_PROBE, checkpoint=NO_CHECKPOINT) -> int:
     '''search cell with the highest chance of containing the target first. returns the number of searches'''
     searches = 0
+    state = checkpoint.restore(board, "rule1")
+    probe.begin(board)
+    if state is not None:
+        searches = state["searches"]
     while True: #continue until target is found
+        checkpoint.tick(board, "rule1", searches=searches)
         searches += 1 #one search per turn
         cell = board.bestContains()
-        if board.explore(cell) == FOUND:
+        probe.mark("select")
+        found = board.explore(cell) == FOUND
+        probe.mark("explore")
+        probe.step(board)
+        if found:
             break
         if moving_target:
             board.target_movement(update_cleared=False)
+            probe.mark("target_movement")
         #otherwise, update probability of searched cell
         board.update_probability(cell)
+        probe.mark("update")
+    checkpoint.end()
+    probe.end(searches)
     return searches
 
-def rule2(board: Board, moving_target=False) -> int:
+def rule2(board: Board, moving_target=False, probe=NULL_PROBE, checkpoint=NO_CHECKPOINT) -> int:
     '''search cell with the highest chance of finding the target first (cells with lower false positive rates). returns the number of searches'''
     searches = 0
+    state = checkpoint.restore(board, "rule2")
+    probe.begin(board)
+    if state is not None:
+        searches = state["searches"]
     while True: #continue until target is found
+        checkpoint.tick(board, "rule2", searches=searches)
         searches += 1 #one search per turn
         cell = board.bestFind()
-        if board.explore(cell) == FOUND:
+        probe.mark("select")
+        found = board.explore(cell) == FOUND
+        probe.mark("explore")
+        probe.step(board)
+        if found:
             break
         if moving_target:
             board.target_movement(update_cleared=False)
+            probe.mark("target_movement")
         #otherwise, update probability of searched cell
         board.update_probability(cell)
+        probe.mark("update")
+    checkpoint.end()
+    probe.end(searches)
     return searches
 
-def basicAgent1(board: Board, moving_target=False) -> int:
+def basicAgent1(board: Board, moving_target=False, probe=NULL_PROBE, checkpoint=NO_CHECKPOINT) -> int:
     '''search cells with the highest chance of containing the target first. Move to neighbors only. Searching the current cell and moving to another cell both count as actions. Returns the number of actions taken.'''
     actions = 0
     best_cell = (-1,-1)
-    curcell = board.bestContains() #Start on best cell
+    state = checkpoint.restore(board, "basicAgent1")
+    probe.begin(board)
+    if state is None:
+        curcell = board.bestContains() #Start on best cell
+        probe.mark("select")
+    else:
+        actions, curcell = state["actions"], tuple(state["curcell"])
     while True: #continue until target is found
+        checkpoint.tick(board, "basicAgent1", actions=actions, curcell=curcell)
         actions += 1 #Exploring the cell is an action
         #Explore the cell
-        if board.explore(curcell) == FOUND:
+        found = board.explore(curcell) == FOUND
+        probe.mark("explore")
+        probe.step(board)
+        if found:
             break
         #Update probabilities
         board.update_probability(curcell)
+        probe.mark("update")
         #Find the next smallest
         best_cell = board.bestContains()
+        probe.mark("select")
         actions += board.manhattan(curcell, best_cell) #Add the actions of moving to the new location
+        probe.walk(board.manhattan(curcell, best_cell))
         if moving_target:
             board.target_movement(update_cleared=False)
+            probe.mark("target_movement")
         curcell = best_cell
+    checkpoint.end()
+    probe.end(actions)
     return actions
 
-def basicAgent2(board: Board, moving_target=False) -> int:
+def basicAgent2(board: Board, moving_target=False, probe=NULL_PROBE, checkpoint=NO_CHECKPOINT) -> int:
     '''search cells with the highest chance of finding the target first (cells with lower false positive rates). Move to neighbors only. Searching the current cell and moving to another cell both count as actions.'''
     actions = 0
     best_cell = (-1,-1)
-    curcell = board.bestFind() #Start on best cell
+    state = checkpoint.restore(board, "basicAgent2")
+    probe.begin(board)
+    if state is None:
+        curcell = board.bestFind() #Start on best cell
+        probe.mark("select")
+    else:
+        actions, curcell = state["actions"], tuple(state["curcell"])
     while True: #continue until target is found
+        checkpoint.tick(board, "basicAgent2", actions=actions, curcell=curcell)
         actions += 1 #Exploring the cell is an action
         #Explore the cell
-        if board.explore(curcell) == FOUND:
+        found = board.explore(curcell) == FOUND
+        probe.mark("explore")
+        probe.step(board)
+        if found:
             break
         #Update probabilities
         board.update_probability(curcell)
+        probe.mark("update")
         #Find the next smallest
         best_cell = board.bestFind()
+        probe.mark("select")
         actions += board.manhattan(curcell, best_cell) #Add the actions of moving to the new location
+        probe.walk(board.manhattan(curcell, best_cell))
         if moving_target:
             board.target_movement(update_cleared=False)
+            probe.mark("target_movement")
         curcell = best_cell
+    checkpoint.end()
+    probe.end(actions)
     return actions
 
-def basicAgent3(board: Board, moving_target=False) -> int:
+def basicAgent3(board: Board, moving_target=False, probe=NULL_PROBE, checkpoint=NO_CHECKPOINT) -> int:
     '''score each cell with (manhattan distance)/(probabily of finding target) and travel to the cell with the lowest score. Move to neighbors only. Searching the current cell and moving to another cell both count as actions'''
     actions = 0
     best_cell = (-1,-1)
-    curcell = board.bestFind() #Start on best cell
+    state = checkpoint.restore(board, "basicAgent3")
+    probe.begin(board)
+    if state is None:
+        curcell = board.bestFind() #Start on best cell
+        probe.mark("select")
+    else:
+        actions, curcell = state["actions"], tuple(state["curcell"])
     while True: #continue until target is found
+        checkpoint.tick(board, "basicAgent3", actions=actions, curcell=curcell)
         actions += 1 #Exploring the cell is an action
         #Explore the cell
-        if board.explore(curcell) == FOUND:
+        found = board.explore(curcell) == FOUND
+        probe.mark("explore")
+        probe.step(board)
+        if found:
             break
         #Update probabilities
         board.update_probability(curcell)
+        probe.mark("update")
         #Find the next smallest
         best_cell = board.bestDistNumpy(curcell)
+        probe.mark("select")
         actions += board.manhattan(curcell, best_cell) #Add the actions of moving to the new location
+        probe.walk(board.manhattan(curcell, best_cell))
         if moving_target:
             board.target_movement(update_cleared=False)
+            probe.mark("target_movement")
         curcell = best_cell
+    checkpoint.end()
+    probe.end(actions)
     return actions
 
-def improvedAgent(board: Board, moving_target=False) -> int:
+def improvedAgent(board: Board, moving_target=False, probe=NULL_PROBE, checkpoint=NO_CHECKPOINT, tries=2) -> int:
     '''A modified version of agent 3 that searches each cell multiple times in a row'''
     actions = 0
     best_cell = (-1,-1)
-    curcell = board.bestFind() #Start on best cell
+    state = checkpoint.restore(board, "improvedAgent")
+    probe.begin(board)
+    if state is None:
+        curcell = board.bestFind() #Start on best cell
+        probe.mark("select")
+    else:
+        actions, curcell = state["actions"], tuple(state["curcell"])
     while True: #continue until target is found
-        #Explore the cell
-        tries = 2
+        checkpoint.tick(board, "improvedAgent", actions=actions, curcell=curcell)
+        #Explore the cell tries times
         #tries = board._board[curcell[0]][curcell[1]] + 2
         for i in range(tries):
             actions += 1 #Exploring the cell is an action
-            if board.explore(curcell) == FOUND:
+            found = board.explore(curcell) == FOUND
+            probe.mark("explore")
+            probe.step(board)
+            if found:
+                checkpoint.end()
+                probe.end(actions)
                 return actions
             #Update probabilities
             board.update_probability(curcell)
+            probe.mark("update")
         #Find the next smallest
         best_cell = board.bestDistNumpy(curcell)
+        probe.mark("select")
         actions += board.manhattan(curcell, best_cell) #Add the actions of moving to the new location
+        probe.walk(board.manhattan(curcell, best_cell))
         if moving_target:
             board.target_movement(update_cleared=False)
+            probe.mark("target_movement")
         curcell = best_cell
     return actions
 
-def moveRule1(board: Board) -> int:
+def moveRule1(board: Board, probe=NULL_PROBE, checkpoint=NO_CHECKPOINT) -> int:
     '''Search cell with highest chance of containing the target on board with a moving target'''
     searches = 0
     target_nearby = False
-    cell = board.bestContainsMoving()
+    state = checkpoint.restore(board, "moveRule1")
+    probe.begin(board)
+    if state is None:
+        cell = board.bestContainsMoving()
+        probe.mark("select")
+    else:
+        searches, cell, target_nearby = state["searches"], tuple(state["cell"]), state["target_nearby"]
     while True: #continue until target is found
+        checkpoint.tick(board, "moveRule1", searches=searches, cell=cell, target_nearby=target_nearby)
         searches += 1 #one search per turn
         if target_nearby:
             board.isNearby(cell)
+            probe.mark("isNearby")
         cell = board.bestContainsMoving()
+        probe.mark("select")
         found_target, target_nearby = board.exploreMove(cell)
+        probe.mark("explore")
+        probe.step(board)
         if found_target:
             break
         board.target_movement(update_cleared=False) #Target walks
+        probe.mark("target_movement")
         #otherwise, update probability of searched cell
         board.update_probability(cell)
+        probe.mark("update")
+    checkpoint.end()
+    probe.end(searches)
     return searches
 
-def moveRule2(board: Board) -> int:
+def moveRule2(board: Board, probe=NULL_PROBE, checkpoint=NO_CHECKPOINT) -> int:
     '''Search cell with highest chance of finding the target on board with a moving target'''
     searches = 0
     target_nearby = False
-    cell = board.bestFindMoving()
+    state = checkpoint.restore(board, "moveRule2")
+    probe.begin(board)
+    if state is None:
+        cell = board.bestFindMoving()
+        probe.mark("select")
+    else:
+        searches, cell, target_nearby = state["searches"], tuple(state["cell"]), state["target_nearby"]
     while True: #continue until target is found
+        checkpoint.tick(board, "moveRule2", searches=searches, cell=cell, target_nearby=target_nearby)
         searches += 1 #one search per turn
         if target_nearby:
             board.isNearby(cell)
+            probe.mark("isNearby")
         cell = board.bestFindMoving()
+        probe.mark("select")
         found_target, target_nearby = board.exploreMove(cell)
+        probe.mark("explore")
+        probe.step(board)
         if found_target:
             break
         board.target_movement(update_cleared=False) #Target walks
+        probe.mark("target_movement")
         #otherwise, update probability of searched cell
         board.update_probability(cell)
+        probe.mark("update")
+    checkpoint.end()
+    probe.end(searches)
     return searches
 
-def moveAgent1(board: Board) -> int:
+def moveAgent1(board: Board, probe=NULL_PROBE, checkpoint=NO_CHECKPOINT) -> int:
     '''Agent 1 that utilizes additional information'''
     target_nearby = False
     actions = 0
-    curcell = board.bestContainsMoving()
+    state = checkpoint.restore(board, "moveAgent1")
+    probe.begin(board)
+    if state is None:
+        curcell = board.bestContainsMoving()
+        probe.mark("select")
+    else:
+        actions, curcell = state["actions"], tuple(state["curcell"])
     best_cell = curcell
     while True: #continue until target is found
+        checkpoint.tick(board, "moveAgent1", actions=actions, curcell=curcell)
         actions += 1 #take 1 action per turn
         found_target, target_nearby = board.exploreMove(curcell) #explore current cell
-        # print(len(np.argwhere(board._known_cleared == 0)))
+        probe.mark("explore")
+        probe.step(board)
+        # print(len(np.argwhere(board._cleared_until <= board._clock)))
         if found_target: #found target, stop
             break
-        board.target_movement() #Target walks
+        board.target_movement(update_cleared=False) #Target walks
+        probe.mark("target_movement")
+        board.update_cleared_cells()
+        probe.mark("update_cleared_cells")
         #otherwise, update probability of searched cell
         board.update_probability(curcell)
+        probe.mark("update")
         if target_nearby:
             board.isNearby(curcell)
+            probe.mark("isNearby")
         best_cell = board.bestContainsMoving()
+        probe.mark("select")
         actions += board.manhattan(curcell, best_cell) #Walking action
+        probe.walk(board.manhattan(curcell, best_cell))
         curcell = best_cell
+    checkpoint.end()
+    probe.end(actions)
     return actions
 
-def moveAgent2(board: Board) -> int:
+def moveAgent2(board: Board, probe=NULL_PROBE, checkpoint=NO_CHECKPOINT) -> int:
     '''Agent 2 that utilizes additional information'''
     target_nearby = False
     actions = 0
-    curcell = board.bestFindMoving()
+    state = checkpoint.restore(board, "moveAgent2")
+    probe.begin(board)
+    if state is None:
+        curcell = board.bestFindMoving()
+        probe.mark("select")
+    else:
+        actions, curcell = state["actions"], tuple(state["curcell"])
     best_cell = curcell
     while True: #continue until target is found
+        checkpoint.tick(board, "moveAgent2", actions=actions, curcell=curcell)
         actions += 1 #take 1 action per turn
         found_target, target_nearby = board.exploreMove(curcell) #explore current cell
+        probe.mark("explore")
+        probe.step(board)
         if found_target: #found target, stop
             break
-        board.target_movement() #Target walks
+        board.target_movement(update_cleared=False) #Target walks
+        probe.mark("target_movement")
+        board.update_cleared_cells()
+        probe.mark("update_cleared_cells")
         #otherwise, update probability of searched cell
         board.update_probability(curcell)
+        probe.mark("update")
         if target_nearby:
             board.isNearby(curcell)
+            probe.mark("isNearby")
         best_cell = board.bestFindMoving()
+        probe.mark("select")
         actions += board.manhattan(curcell, best_cell) #Walking action
+        probe.walk(board.manhattan(curcell, best_cell))
         curcell = best_cell
+    checkpoint.end()
+    probe.end(actions)
     return actions
 
-def moveAgent3(board: Board) -> int:
+def moveAgent3(board: Board, probe=NULL_PROBE, checkpoint=NO_CHECKPOINT) -> int:
     '''Agent 3 that utilizes additional information'''
     target_nearby = False
     actions = 0
-    curcell = board.bestFindMoving() #Use for initial cell
+    state = checkpoint.restore(board, "moveAgent3")
+    probe.begin(board)
+    if state is None:
+        curcell = board.bestFindMoving() #Use for initial cell
+        probe.mark("select")
+    else:
+        actions, curcell = state["actions"], tuple(state["curcell"])
     best_cell = curcell
     while True: #continue until target is found
+        checkpoint.tick(board, "moveAgent3", actions=actions, curcell=curcell)
         actions += 1 #take 1 action per turn
         found_target, target_nearby = board.exploreMove(curcell) #explore current cell
+        probe.mark("explore")
+        probe.step(board)
         if found_target: #found target, stop
             break
-        board.target_movement() #Target walks
+        board.target_movement(update_cleared=False) #Target walks
+        probe.mark("target_movement")
+        board.update_cleared_cells()
+        probe.mark("update_cleared_cells")
         #otherwise, update probability of searched cell
         board.update_probability(curcell)
+        probe.mark("update")
         if target_nearby:
             board.isNearby(curcell)
+            probe.mark("isNearby")
         best_cell = board.bestDistMoving(curcell)
+        probe.mark("select")
         actions += board.manhattan(curcell, best_cell) #Walking action
+        probe.walk(board.manhattan(curcell, best_cell))
         curcell = best_cell
+    checkpoint.end()
+    probe.end(actions)
     return actions
 
-def moveImprovedAgent(board: Board) -> int:
+def moveImprovedAgent(board: Board, probe=NULL_PROBE, checkpoint=NO_CHECKPOINT, tries=2) -> int:
     '''Improved agent that utilizes additional information'''
     target_nearby = False
     actions = 0
-    curcell = board.bestFindMoving() #Use for initial cell
+    state = checkpoint.restore(board, "moveImprovedAgent")
+    probe.begin(board)
+    if state is None:
+        curcell = board.bestFindMoving() #Use for initial cell
+        probe.mark("select")
+    else:
+        actions, curcell = state["actions"], tuple(state["curcell"])
     best_cell = curcell
     found = False
     while True: #continue until target is found
-        tries = 2
+        checkpoint.tick(board, "moveImprovedAgent", actions=actions, curcell=curcell)
         for _ in range(tries):
             actions += 1 #take 1 action per turn
             found_target, target_nearby = board.exploreMove(curcell) #explore current cell
+            probe.mark("explore")
+            probe.step(board)
             if found_target: #found target, stop
                 found = True
                 break
-            board.target_movement() #Target walks
+            board.target_movement(update_cleared=False) #Target walks
+            probe.mark("target_movement")
+            board.update_cleared_cells()
+            probe.mark("update_cleared_cells")
             #otherwise, update probability of searched cell
             board.update_probability(curcell)
+            probe.mark("update")
         if found:
             break
         if target_nearby:
             board.isNearby(curcell)
+            probe.mark("isNearby")
         best_cell = board.bestDistMoving(curcell)
+        probe.mark("select")
+        actions += board.manhattan(curcell, best_cell) #Walking action
+        probe.walk(board.manhattan(curcell, best_cell))
+        curcell = best_cell
+    checkpoint.end()
+    probe.end(actions)
+    return actions
+
+def moveFilterAgent1(board: Board, probe=NULL_PROBE, checkpoint=NO_CHECKPOINT) -> int:
+    '''Agent 1 on a belief that follows the moving target, the board needs moving_target=True and belief_filter=True'''
+    actions = 0
+    state = checkpoint.restore(board, "moveFilterAgent1")
+    probe.begin(board)
+    if state is None:
+        curcell = board.bestContains()
+        probe.mark("select")
+    else:
+        actions, curcell = state["actions"], tuple(state["curcell"])
+    while True: #continue until target is found
+        checkpoint.tick(board, "moveFilterAgent1", actions=actions, curcell=curcell)
+        actions += 1 #take 1 action per turn
+        found_target, target_nearby = board.exploreMove(curcell) #explore current cell
+        probe.mark("explore")
+        probe.step(board)
+        if found_target: #found target, stop
+            break
+        board.target_movement(update_cleared=False) #Target walks
+        probe.mark("target_movement")
+        board.observe(curcell, target_nearby) #Condition on the search and the nearby signal
+        board.predict() #Follow the walk
+        probe.mark("update")
+        best_cell = board.bestContains()
+        probe.mark("select")
+        actions += board.manhattan(curcell, best_cell) #Walking action
+        probe.walk(board.manhattan(curcell, best_cell))
+        curcell = best_cell
+    checkpoint.end()
+    probe.end(actions)
+    return actions
+
+def moveFilterAgent2(board: Board, probe=NULL_PROBE, checkpoint=NO_CHECKPOINT) -> int:
+    '''Agent 2 on a belief that follows the moving target, the board needs moving_target=True and belief_filter=True'''
+    actions = 0
+    state = checkpoint.restore(board, "moveFilterAgent2")
+    probe.begin(board)
+    if state is None:
+        curcell = board.bestFind()
+        probe.mark("select")
+    else:
+        actions, curcell = state["actions"], tuple(state["curcell"])
+    while True: #continue until target is found
+        checkpoint.tick(board, "moveFilterAgent2", actions=actions, curcell=curcell)
+        actions += 1 #take 1 action per turn
+        found_target, target_nearby = board.exploreMove(curcell) #explore current cell
+        probe.mark("explore")
+        probe.step(board)
+        if found_target: #found target, stop
+            break
+        board.target_movement(update_cleared=False) #Target walks
+        probe.mark("target_movement")
+        board.observe(curcell, target_nearby) #Condition on the search and the nearby signal
+        board.predict() #Follow the walk
+        probe.mark("update")
+        best_cell = board.bestFind()
+        probe.mark("select")
         actions += board.manhattan(curcell, best_cell) #Walking action
+        probe.walk(board.manhattan(curcell, best_cell))
         curcell = best_cell
+    checkpoint.end()
+    probe.end(actions)
     return actions
+
+def moveFilterAgent3(board: Board, probe=NULL_PROBE, checkpoint=NO_CHECKPOINT) -> int:
+    '''Agent 3 on a belief that follows the moving target, the board needs moving_target=True and belief_filter=True'''
+    actions = 0
+    state = checkpoint.restore(board, "moveFilterAgent3")
+    probe.begin(board)
+    if state is None:
+        curcell = board.bestFind() #Use for initial cell
+        probe.mark("select")
+    else:
+        actions, curcell = state["actions"], tuple(state["curcell"])
+    while True: #continue until target is found
+        checkpoint.tick(board, "moveFilterAgent3", actions=actions, curcell=curcell)
+        actions += 1 #take 1 action per turn
+        found_target, target_nearby = board.exploreMove(curcell) #explore current cell
+        probe.mark("explore")
+        probe.step(board)
+        if found_target: #found target, stop
+            break
+        board.target_movement(update_cleared=False) #Target walks
+        probe.mark("target_movement")
+        board.observe(curcell, target_nearby) #Condition on the search and the nearby signal
+        board.predict() #Follow the walk
+        probe.mark("update")
+        best_cell = board.bestDistNumpy(curcell)
+        probe.mark("select")
+        actions += board.manhattan(curcell, best_cell) #Walking action
+        probe.walk(board.manhattan(curcell, best_cell))
+        curcell = best_cell
+    checkpoint.end()
+    probe.end(actions)
+    return actions
+
+def moveFilterImprovedAgent(board: Board, probe=NULL_PROBE, checkpoint=NO_CHECKPOINT, tries=2) -> int:
+    '''Improved agent on a belief that follows the moving target, the board needs moving_target=True and belief_filter=True'''
+    actions = 0
+    state = checkpoint.restore(board, "moveFilterImprovedAgent")
+    probe.begin(board)
+    if state is None:
+        curcell = board.bestFind() #Use for initial cell
+        probe.mark("select")
+    else:
+        actions, curcell = state["actions"], tuple(state["curcell"])
+    while True: #continue until target is found
+        checkpoint.tick(board, "moveFilterImprovedAgent", actions=actions, curcell=curcell)
+        for _ in range(tries):
+            actions += 1 #take 1 action per turn
+            found_target, target_nearby = board.exploreMove(curcell) #explore current cell
+            probe.mark("explore")
+            probe.step(board)
+            if found_target: #found target, stop
+                checkpoint.end()
+                probe.end(actions)
+                return actions
+            board.target_movement(update_cleared=False) #Target walks
+            probe.mark("target_movement")
+            board.observe(curcell, target_nearby) #Condition on the search and the nearby signal
+            board.predict() #Follow the walk
+            probe.mark("update")
+        best_cell = board.bestDistNumpy(curcell)
+        probe.mark("select")
+        actions += board.manhattan(curcell, best_cell) #Walking action
+        probe.walk(board.manhattan(curcell, best_cell))
+        curcell = best_cell
+    return actions
+
+def teamAgent(board: Board, searchers: int, rule="dist", moving_target=False, probe=NULL_PROBE) -> tuple:
+    '''searchers agents share the board and search distinct cells every step, picked like Agent 1 ("contains"), Agent 2
+    ("find") or Agent 3 ("dist"). Returns (total actions, wall clock actions): the searchers act at the same time, so a
+    step takes one search plus the longest walk of wall clock time. With one searcher this is exactly that agent.'''
+    if not 0 < searchers <= board.dim**2:
+        raise Exception("Invalid number of searchers")
+    total = 0
+    wall = 0
+    probe.begin(board)
+    cells = board.bestContainsK(searchers) if rule == "contains" else board.bestFindK(searchers) #Start on the best cells
+    probe.mark("select")
+    while True: #continue until target is found
+        total += searchers #Every searcher explores its cell
+        wall += 1
+        target = board.target[0]*board.dim + board.target[1]
+        found = target in cells and board.explore(board.target) == FOUND #Only the cell holding the target can find it
+        probe.mark("explore")
+        probe.step(board)
+        if found:
+            break
+        board.update_probabilities(cells)
+        probe.mark("update")
+        if rule == "dist":
+            best_cells = board.bestDistK(cells)
+        else:
+            best_cells = assignNearest(board.dim, cells, board.bestContainsK(searchers) if rule == "contains" else board.bestFindK(searchers))
+        probe.mark("select")
+        walk = np.abs(best_cells // board.dim - cells // board.dim) + np.abs(best_cells % board.dim - cells % board.dim)
+        total += int(walk.sum()) #Add the actions of moving to the new locations
+        wall += int(walk.max())
+        probe.walk(walk.sum())
+        if moving_target:
+            board.target_movement(update_cleared=False)
+            probe.mark("target_movement")
+        cells = best_cells
+    probe.end(total)
+    return total, wall
@@ -0,0 +1,126 @@
+'''Exact action distributions of the stationary target agents, without sampling targets
+
+With a stationary target every search before the one that succeeds comes back missing, so the cells an agent searches
+are the same whatever the target and the sensor draws, and only the step at which the run stops is random. Running the
+agent once on a board whose target is nowhere gives that sequence, and the chance of stopping at each step follows from
+the prior (the initial belief) and the miss rates of the cells searched so far. The sequence is cut once the target
+would be found with probability 1 - tolerance, and the rest is reported as unresolved.
+'''
+
+from multiprocessing import Pool
+
+import numpy as np
+
+from Board import Board, EXPLORED
+from Experiment import AGENTS, PERCENTILES, trialSeed
+from Instrument import NullProbe
+from Results import Z_95
+from Trajectory import Columns
+
+TOLERANCE = 1e-6 #Probability of not having found the target at which the sequence is cut
+MAX_STEPS = 10**7
+
+
+class _Finished(Exception):
+    '''Raised by a FailureSequence to stop the agent it follows'''
+
+
+class _LastExplored:
+    '''Board journal that only keeps the cell explored last'''
+
+    def __init__(self):
+        self.cell = -1
+
+    def append(self, op: int, a: int, b: int) -> None:
+        if op == EXPLORED:
+            self.cell = a
+
+
+class FailureSequence(NullProbe):
+    '''Probe following a run in which the target is never found, with the chance that the real run stops at each step
+
+    The actions column holds the actions the agent would return if it found the target at that step, and probability
+    the chance that it does.
+    '''
+
+    def __init__(self, tolerance=TOLERANCE, max_steps=MAX_STEPS):
+        self.tolerance = tolerance
+        self.max_steps = max_steps
+        self.steps = Columns({"actions": np.int64, "probability": np.float64})
+        self.unresolved = 1.0
+        self._walked = 0
+
+    def begin(self, board) -> None:
+        prior = np.asarray(board.board, dtype=np.float64).ravel()
+        self._remaining = prior / prior.sum() #P(target in the cell and not found yet)
+        self._find = np.take(board._find_rates, board._board).ravel()
+        self._journal = _LastExplored()
+        board._journal = self._journal
+
+    def walk(self, distance) -> None:
+        self._walked += int(distance)
+
+    def step(self, board) -> None:
+        cell = self._journal.cell
+        found = self._remaining[cell] * self._find[cell]
+        self._remaining[cell] -= found
+        self.unresolved -= found
+        self.steps.append(len(self.steps) + 1 + self._walked, found)
+        if self.unresolved <= self.tolerance or len(self.steps) >= self.max_steps:
+            board._journal = None
+            raise _Finished()
+
+
+def actionDistribution(name: str, board: Board, tolerance=TOLERANCE, max_steps=MAX_STEPS) -> tuple:
+    '''(actions, probabilities, unresolved probability) of an agent of Experiment.AGENTS with a stationary target, on the
+    terrain and prior of board. The board's target is ignored, and the board is used up'''
+    agent, board_kwargs, kwargs = AGENTS[name]
+    if board_kwargs.get("moving_target", False):
+        raise Exception(f"{name} has a moving target, its search sequence depends on where the target goes")
+    board.target = (-1, -1) #Nowhere, so every search misses
+    sequence = FailureSequence(tolerance, max_steps)
+    try:
+        agent(board, probe=sequence, **kwargs)
+    except _Finished:
+        pass
+    return sequence.steps.column("actions").copy(), sequence.steps.column("probability").copy(), max(sequence.unresolved, 0.0)
+
+def exactTerrain(task: tuple) -> tuple:
+    '''actionDistribution on the terrain of trial `trial`, task is (agent name, dim, base seed, trial, tolerance)'''
+    name, dim, seed, trial, tolerance = task
+    return actionDistribution(name, Board(dim, rng=trialSeed(seed, trial), **AGENTS[name][1]), tolerance)
+
+def exactTrials(name: str, dim: int, terrains: int, workers=1, seed=0, tolerance=TOLERANCE) -> dict:
+    '''Experiment.summarize statistics of an agent's actions over the terrains runTrials would use for as many trials
+
+    The mean, standard deviation and percentiles are those of the mixture of the exact per terrain distributions,
+    with the unresolved mass of each counted at its last step, so they only vary with the terrains sampled. The
+    confidence interval comes from the spread of the per terrain means.
+    '''
+    tasks = [(name, dim, seed, trial, tolerance) for trial in range(terrains)]
+    if workers <= 1:
+        results = [exactTerrain(task) for task in tasks]
+    else:
+        with Pool(workers) as pool:
+            results = pool.map(exactTerrain, tasks, chunksize=max(1, terrains // (workers*4)))
+    actions, weights, means, unresolved = [], [], [], 0.0
+    for terrain_actions, probabilities, terrain_unresolved in results:
+        terrain_weights = probabilities.copy()
+        terrain_weights[-1] += terrain_unresolved
+        actions.append(terrain_actions)
+        weights.append(terrain_weights / terrains)
+        means.append(np.dot(terrain_actions, terrain_weights))
+        unresolved += terrain_unresolved / terrains
+    order = np.argsort(np.concatenate(actions), kind='stable')
+    actions, weights, means = np.concatenate(actions)[order], np.concatenate(weights)[order], np.array(means)
+    cumulative = np.cumsum(weights)
+    mean = float(np.dot(actions, weights))
+    half_width = Z_95 * means.std(ddof=1) / np.sqrt(terrains) if terrains > 1 else 0.0
+    stats = {"trials": terrains, "mean": mean, "median": float(actions[np.searchsorted(cumulative, 0.5)]),
+             "std": float(np.sqrt(np.dot((actions - mean)**2, weights)))}
+    for p in PERCENTILES:
+        stats[f"p{p}"] = float(actions[min(len(actions)-1, np.searchsorted(cumulative, p / 100))])
+    stats["ci_low"] = mean - half_width
+    stats["ci_high"] = mean + half_width
+    stats["unresolved"] = float(unresolved)
+    return stats
@@ -0,0 +1,259 @@
+'''Batched representation of many landscapes, advanced in lockstep'''
+
+import numpy as np
+
+from Board import BLOCK
+from Storage import FIND_RATES, MISS_RATES, generateTerrain, makeRng
+
+FIND_RATE = np.array(FIND_RATES) #Probability of finding the target in a cell of each terrain, indexed by terrain code
+MISS_RATE = np.array(MISS_RATES) #Probability of missing the target in a cell of each terrain, indexed by terrain code
+
+MOVES = np.array([(-1, 0), (1, 0), (0, -1), (0, 1)]) #Same neighbor order as Board.getNeighbors
+
+
+def diamondOffsets(radius: int) -> np.ndarray:
+    '''returns the (row, col) offsets of every cell within manhattan distance radius of the origin'''
+    rows, cols = np.mgrid[-radius:radius+1, -radius:radius+1]
+    inside = (np.abs(rows) + np.abs(cols)) <= radius
+    return np.stack((rows[inside], cols[inside]), axis=1)
+
+
+class BatchBoard:
+    '''N independent landscapes stored as stacked (N, dim, dim) arrays
+
+    Every method takes an index array selecting which boards take part, so that finished boards can be masked out.
+    Positions are passed and returned as (k, 2) integer arrays, one row per selected board.
+    '''
+
+    def __init__(self, n: int, dim: int, copy_boards=None, copy_targets=None, moving_target=False, rng=None):
+        self.n = n
+        self.dim = dim
+        self.rng = makeRng(rng) #Every random draw of the batch
+        if copy_boards is None:
+            self._board = np.stack([generateTerrain(dim, np.int64, rng=self.rng) for _ in range(n)])
+            self.targets = self.rng.integers(dim, size=(n, 2)) #position of the target on each board
+        else:
+            self._board = np.asarray(copy_boards)
+            self.targets = np.array(copy_targets, dtype=int).reshape(n, 2)
+        self.board = np.full((n, dim, dim), 1/(dim**2)) #probability of each cell being the target
+        self._board_mask = FIND_RATE[self._board] #Probability that you successfully find if they are in the cell
+        self._rows = np.arange(dim)
+        if moving_target:
+            self._known_cleared = np.zeros((n, dim, dim))
+
+    @classmethod
+    def fromBoards(cls, boards: list, moving_target=False, rng=None):
+        '''Stack existing Board objects (same dim) into a batch with the same terrains and targets'''
+        return cls(len(boards), boards[0].dim, np.stack([b._board for b in boards]), [b.target for b in boards], moving_target, rng)
+
+    def explore(self, idx: np.ndarray, pos: np.ndarray) -> np.ndarray:
+        '''explore pos[i] on board idx[i], returns a boolean array of which boards found the target'''
+        hit = np.all(self.targets[idx] == pos, axis=1)
+        terrain = self._board[idx, pos[:, 0], pos[:, 1]]
+        return hit & (self.rng.random(len(idx)) < FIND_RATE[terrain])
+
+    def update_probability(self, idx: np.ndarray, pos: np.ndarray) -> None:
+        '''Update the board probabilities after exploring the cells'''
+        terrain = self._board[idx, pos[:, 0], pos[:, 1]]
+        self.board[idx, pos[:, 0], pos[:, 1]] *= MISS_RATE[terrain]
+        return
+
+    def target_movement(self, idx: np.ndarray, update_cleared=True) -> None:
+        '''Move each selected target to a uniformly chosen valid neighbor'''
+        if self.dim > 1:
+            candidates = self.targets[idx][:, None, :] + MOVES[None, :, :] #(k, 4, 2)
+            valid = np.all((candidates >= 0) & (candidates < self.dim), axis=2)
+            counts = valid.sum(axis=1)
+            pick = (self.rng.random(len(idx)) * counts).astype(int) #Which of the valid neighbors to take
+            choice = (np.cumsum(valid, axis=1) > pick[:, None]).argmax(axis=1)
+            self.targets[idx] = candidates[np.arange(len(idx)), choice]
+        if update_cleared:
+            self.update_cleared_cells(idx)
+        return
+
+    def update_cleared_cells(self, idx: np.ndarray) -> None:
+        '''Update the cleared cells matrices upon another action'''
+        self._known_cleared[idx] = np.maximum(0, self._known_cleared[idx] - 1)
+        return
+
+    def exploreMove(self, idx: np.ndarray, pos: np.ndarray, radius=5) -> tuple:
+        '''explore for moving targets, returns boolean arrays (found target, target within radius manhattan distance)'''
+        found = self.explore(idx, pos)
+        nearby = self.manhattan(pos, self.targets[idx]) <= radius
+        far = idx[~found & ~nearby]
+        if len(far) > 0:
+            #Prevent the diamond around each searched cell from being visited again soon
+            offsets = diamondOffsets(radius)
+            far_pos = pos[~found & ~nearby]
+            rows = far_pos[:, 0, None] + offsets[None, :, 0]
+            cols = far_pos[:, 1, None] + offsets[None, :, 1]
+            inside = (rows >= 0) & (rows < self.dim) & (cols >= 0) & (cols < self.dim)
+            boards = np.broadcast_to(far[:, None], rows.shape)
+            turns = np.broadcast_to(radius - np.abs(offsets).sum(axis=1), rows.shape) #Number of turns until the target can walk to the position
+            self._known_cleared[boards[inside], rows[inside], cols[inside]] = turns[inside]
+        return found, found | nearby
+
+    def isNearby(self, idx: np.ndarray, pos: np.ndarray, radius=5) -> None:
+        '''Restrict search space to cells that are nearby'''
+        #Cells within radius give a negative value, so the maximum leaves them untouched
+        distance = self.distances(pos)
+        self._known_cleared[idx] = np.maximum(self._known_cleared[idx], distance - (radius+1))
+        return
+
+    def manhattan(self, pos1: np.ndarray, pos2: np.ndarray) -> np.ndarray:
+        return np.abs(pos1 - pos2).sum(axis=1)
+
+    def distances(self, pos: np.ndarray) -> np.ndarray:
+        '''returns the (k, dim, dim) manhattan distance from pos[i] to every cell'''
+        row_diff = np.abs(self._rows[None, :] - pos[:, 0, None])
+        col_diff = np.abs(self._rows[None, :] - pos[:, 1, None])
+        return row_diff[:, :, None] + col_diff[:, None, :]
+
+    def _argmax(self, scores: np.ndarray) -> np.ndarray:
+        flat = scores.reshape(len(scores), self.dim*self.dim).argmax(axis=1)
+        return np.stack((flat // self.dim, flat % self.dim), axis=1)
+
+    def _argmin(self, scores: np.ndarray) -> np.ndarray:
+        flat = scores.reshape(len(scores), self.dim*self.dim).argmin(axis=1)
+        return np.stack((flat // self.dim, flat % self.dim), axis=1)
+
+    def bestContains(self, idx: np.ndarray) -> np.ndarray:
+        '''returns cell with best chance of containing the target on each selected board'''
+        return self._argmax(self.board[idx])
+
+    def bestContainsMoving(self, idx: np.ndarray) -> np.ndarray:
+        '''Returns cell with best chance out of cells that are not cleared'''
+        return self._argmax(self.board[idx] * (self._known_cleared[idx] == 0))
+
+    def bestFind(self, idx: np.ndarray) -> np.ndarray:
+        '''returns cell with best chance of finding the target on each selected board'''
+        return self._argmax(self.board[idx] * self._board_mask[idx])
+
+    def bestFindMoving(self, idx: np.ndarray) -> np.ndarray:
+        '''Returns cell with best chance out of cells that are not cleared'''
+        return self._argmax(self.board[idx] * self._board_mask[idx] * (self._known_cleared[idx] == 0))
+
+    def bestDistNumpy(self, idx: np.ndarray, pos: np.ndarray) -> np.ndarray:
+        '''(Manhattan Distance)/(Probability) heuristic'''
+        distance_mask = self.distances(pos) + 1
+        return self._argmin(np.divide(distance_mask, self.board[idx]*self._board_mask[idx]))
+
+    def bestDistMoving(self, idx: np.ndarray, pos: np.ndarray) -> np.ndarray:
+        '''(Manhattan Distance)/(Probability) heuristic with moving target'''
+        distance_mask = (self.distances(pos) + 1) * np.where(self._known_cleared[idx] == 0, 1, BLOCK) #Prevent those which have been cleared from being chosen
+        return self._argmin(np.divide(distance_mask, self.board[idx]*self._board_mask[idx]))
+
+
+def _rule(batch: BatchBoard, select, moving_target: bool) -> np.ndarray:
+    '''Shared loop of rule1/rule2, select(active) picks the cell to search on each active board'''
+    searches = np.zeros(batch.n, dtype=int)
+    active = np.arange(batch.n)
+    while len(active) > 0: #continue until every target is found
+        searches[active] += 1 #one search per turn
+        cells = select(active)
+        found = batch.explore(active, cells)
+        active, cells = active[~found], cells[~found] #Finished boards drop out
+        if moving_target:
+            batch.target_movement(active, update_cleared=False)
+        batch.update_probability(active, cells)
+    return searches
+
+def _agent(batch: BatchBoard, start, select, moving_target: bool, tries=1) -> np.ndarray:
+    '''Shared loop of basicAgent1/2/3 and improvedAgent, select(active, curcells) picks the next cell on each active board'''
+    actions = np.zeros(batch.n, dtype=int)
+    active = np.arange(batch.n)
+    curcells = start(active) #Start on best cell
+    while len(active) > 0: #continue until every target is found
+        for _ in range(tries):
+            actions[active] += 1 #Exploring the cell is an action
+            found = batch.explore(active, curcells)
+            active, curcells = active[~found], curcells[~found] #Finished boards drop out
+            batch.update_probability(active, curcells)
+        best_cells = select(active, curcells)
+        actions[active] += batch.manhattan(curcells, best_cells) #Add the actions of moving to the new location
+        if moving_target:
+            batch.target_movement(active, update_cleared=False)
+        curcells = best_cells
+    return actions
+
+def _moveRule(batch: BatchBoard, select) -> np.ndarray:
+    '''Shared loop of moveRule1/moveRule2'''
+    searches = np.zeros(batch.n, dtype=int)
+    active = np.arange(batch.n)
+    nearby = np.zeros(batch.n, dtype=bool)
+    cells = select(active)
+    while len(active) > 0: #continue until every target is found
+        searches[active] += 1 #one search per turn
+        batch.isNearby(active[nearby], cells[nearby])
+        cells = select(active)
+        found, nearby = batch.exploreMove(active, cells)
+        active, cells, nearby = active[~found], cells[~found], nearby[~found] #Finished boards drop out
+        batch.target_movement(active, update_cleared=False) #Target walks
+        batch.update_probability(active, cells)
+    return searches
+
+def _moveAgent(batch: BatchBoard, start, select, tries=1) -> np.ndarray:
+    '''Shared loop of moveAgent1/2/3 and moveImprovedAgent, select(active, curcells) picks the next cell on each active board'''
+    actions = np.zeros(batch.n, dtype=int)
+    active = np.arange(batch.n)
+    curcells = start(active) #Use for initial cell
+    while len(active) > 0: #continue until every target is found
+        for _ in range(tries):
+            actions[active] += 1 #take 1 action per turn
+            found, nearby = batch.exploreMove(active, curcells)
+            active, curcells, nearby = active[~found], curcells[~found], nearby[~found] #Finished boards drop out
+            batch.target_movement(active) #Target walks
+            batch.update_probability(active, curcells)
+        batch.isNearby(active[nearby], curcells[nearby])
+        best_cells = select(active, curcells)
+        actions[active] += batch.manhattan(curcells, best_cells) #Walking action
+        curcells = best_cells
+    return actions
+
+def batchRule1(batch: BatchBoard, moving_target=False) -> np.ndarray:
+    '''Batched rule1, returns the number of searches on each board'''
+    return _rule(batch, batch.bestContains, moving_target)
+
+def batchRule2(batch: BatchBoard, moving_target=False) -> np.ndarray:
+    '''Batched rule2, returns the number of searches on each board'''
+    return _rule(batch, batch.bestFind, moving_target)
+
+def batchAgent1(batch: BatchBoard, moving_target=False) -> np.ndarray:
+    '''Batched basicAgent1, returns the number of actions on each board'''
+    return _agent(batch, batch.bestContains, lambda active, _: batch.bestContains(active), moving_target)
+
+def batchAgent2(batch: BatchBoard, moving_target=False) -> np.ndarray:
+    '''Batched basicAgent2, returns the number of actions on each board'''
+    return _agent(batch, batch.bestFind, lambda active, _: batch.bestFind(active), moving_target)
+
+def batchAgent3(batch: BatchBoard, moving_target=False) -> np.ndarray:
+    '''Batched basicAgent3, returns the number of actions on each board'''
+    return _agent(batch, batch.bestFind, batch.bestDistNumpy, moving_target)
+
+def batchImprovedAgent(batch: BatchBoard, moving_target=False) -> np.ndarray:
+    '''Batched improvedAgent, returns the number of actions on each board'''
+    return _agent(batch, batch.bestFind, batch.bestDistNumpy, moving_target, tries=2)
+
+def batchMoveRule1(batch: BatchBoard) -> np.ndarray:
+    '''Batched moveRule1, the batch must be built with moving_target=True'''
+    return _moveRule(batch, batch.bestContainsMoving)
+
+def batchMoveRule2(batch: BatchBoard) -> np.ndarray:
+    '''Batched moveRule2, the batch must be built with moving_target=True'''
+    return _moveRule(batch, batch.bestFindMoving)
+
+def batchMoveAgent1(batch: BatchBoard) -> np.ndarray:
+    '''Batched moveAgent1, the batch must be built with moving_target=True'''
+    return _moveAgent(batch, batch.bestContainsMoving, lambda active, _: batch.bestContainsMoving(active))
+
+def batchMoveAgent2(batch: BatchBoard) -> np.ndarray:
+    '''Batched moveAgent2, the batch must be built with moving_target=True'''
+    return _moveAgent(batch, batch.bestFindMoving, lambda active, _: batch.bestFindMoving(active))
+
+def batchMoveAgent3(batch: BatchBoard) -> np.ndarray:
+    '''Batched moveAgent3, the batch must be built with moving_target=True'''
+    return _moveAgent(batch, batch.bestFindMoving, batch.bestDistMoving)
+
+def batchMoveImprovedAgent(batch: BatchBoard) -> np.ndarray:
+    '''Batched moveImprovedAgent, the batch must be built with moving_target=True'''
+    return _moveAgent(batch, batch.bestFindMoving, batch.bestDistMoving, tries=2)
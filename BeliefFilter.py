@@ -0,0 +1,56 @@
+'''Transition step of the moving target belief filter
+
+The target moves to a uniformly chosen valid neighbor (Board.target_movement), so a cell with d neighbors sends 1/d of
+its probability to each of them.
+'''
+
+import numpy as np
+
+
+def inverseDegree(dim: int) -> np.ndarray:
+    '''returns 1/(number of valid neighbors) for every cell of a dim x dim board, 0 for the neighborless cell of dim 1'''
+    degree = np.full((dim, dim), 4.0)
+    degree[0, :] -= 1
+    degree[-1, :] -= 1
+    degree[:, 0] -= 1
+    degree[:, -1] -= 1
+    return np.divide(1, degree, out=np.zeros((dim, dim)), where=degree > 0)
+
+def randomWalkStep(belief: np.ndarray, inv_degree: np.ndarray, out: np.ndarray) -> np.ndarray:
+    '''One step of the exact transition as a 4 neighbor stencil, written into out (which must not be belief)'''
+    share = belief * inv_degree #Probability sent to each neighbor
+    out.fill(0)
+    out[1:, :] += share[:-1, :]
+    out[:-1, :] += share[1:, :]
+    out[:, 1:] += share[:, :-1]
+    out[:, :-1] += share[:, 1:]
+    return out
+
+def _foldIndex(dim: int, pad: int) -> np.ndarray:
+    '''Board row (or column) of every padded row, mirroring at the edges'''
+    padded = np.arange(-pad, dim+pad) % (2*dim)
+    return np.where(padded < dim, padded, 2*dim-1-padded)
+
+def randomWalkFFT(belief: np.ndarray, steps: int) -> np.ndarray:
+    '''Approximate distribution after many steps, computed with one FFT instead of steps stencil passes
+
+    The free space walk kernel is applied in the frequency domain on a board padded by steps cells, then the mass that
+    walked off the board is mirrored back. Away from the edges this matches the exact transition, near the edges it
+    treats them as reflecting rather than redistributing between the remaining neighbors.
+    '''
+    dim = belief.shape[0]
+    size = dim + 2*steps
+    padded = np.zeros((size, size))
+    padded[steps:steps+dim, steps:steps+dim] = belief
+    freq_rows = np.fft.fftfreq(size)[:, None]
+    freq_cols = np.fft.rfftfreq(size)[None, :]
+    kernel = ((np.cos(2*np.pi*freq_rows) + np.cos(2*np.pi*freq_cols)) / 2) ** steps #One step moves a quarter of the mass each way
+    walked = np.fft.irfft2(np.fft.rfft2(padded) * kernel, s=(size, size))
+    np.maximum(walked, 0, out=walked) #Round off can leave tiny negative values
+    #Sum the padded rows, then columns, onto the board cells they mirror to, O(dim*size) instead of a matrix product
+    board_index = _foldIndex(dim, steps)
+    rows = np.zeros((dim, size))
+    np.add.at(rows, board_index, walked)
+    folded = np.zeros((dim, dim))
+    np.add.at(folded, (slice(None), board_index), rows)
+    return folded
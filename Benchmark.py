@@ -0,0 +1,137 @@
+'''Benchmark suite for the Board queries and the agents
+
+Valid Arguments:
+    python3 Benchmark.py run <Output JSON> [<Board Dimension> ...]
+    - Board Dimension: dims for the Board method benchmarks, default 50 200 500
+    python3 Benchmark.py compare <Baseline JSON> <Current JSON> [<Threshold>]
+    - Threshold: allowed relative slowdown before a result is flagged, default 0.2
+
+    Agents always run at AGENT_DIMS with seeds AGENT_SEEDS. Their action counts are recorded as well, since with fixed
+    seeds any change in them means the behavior changed, not just the speed.
+'''
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+from Board import Board
+from Experiment import AGENTS
+
+BOARD_DIMS = [50, 200, 500]
+AGENT_DIMS = [10, 20]
+AGENT_SEEDS = range(5)
+BOARD_SEED = 0
+REPEATS = 20 #Timed calls per Board method, the median is reported
+WARMUP = 2
+
+
+def _pos(board: Board) -> tuple:
+    return (board.dim//3, board.dim//2)
+
+#name: (needs a moving target board, call)
+BOARD_METHODS = {
+    "bestContains": (False, lambda board: board.bestContains()),
+    "bestContainsMoving": (True, lambda board: board.bestContainsMoving()),
+    "bestFind": (False, lambda board: board.bestFind()),
+    "bestFindMoving": (True, lambda board: board.bestFindMoving()),
+    "bestDistNumpy": (False, lambda board: board.bestDistNumpy(_pos(board))),
+    "bestDistMoving": (True, lambda board: board.bestDistMoving(_pos(board))),
+    "bestWeightedDist": (False, lambda board: board.bestWeightedDist(_pos(board))),
+    "bestWeightedDist2": (False, lambda board: board.bestWeightedDist2(_pos(board))),
+    "bestLocal": (False, lambda board: board.bestLocal(_pos(board), 5)),
+    "bestLocalMoving": (True, lambda board: board.bestLocalMoving(_pos(board), 5)),
+    "bestLocal2": (False, lambda board: board.bestLocal2(_pos(board), 5)),
+    "bestLocal2Moving": (True, lambda board: board.bestLocal2Moving(_pos(board), 5)),
+    "bestLocal3": (True, lambda board: board.bestLocal3(_pos(board), 5)),
+    "explore": (False, lambda board: board.explore(_pos(board))),
+    "exploreMove": (True, lambda board: board.exploreMove(_pos(board))),
+    "isNearby": (True, lambda board: board.isNearby(_pos(board))),
+    "update_probability": (False, lambda board: board.update_probability(_pos(board))),
+    "update_cleared_cells": (True, lambda board: board.update_cleared_cells()),
+    "target_movement": (True, lambda board: board.target_movement()),
+}
+
+
+def benchmarkBoard(name: str, dim: int) -> dict:
+    '''Median seconds per call of a Board method on a seeded board with some search history'''
+    moving_target, call = BOARD_METHODS[name]
+    board = Board(dim, moving_target=moving_target, rng=BOARD_SEED)
+    for row in range(min(dim, 10)): #Give the belief (and cleared map) some structure
+        board.update_probability((row, row))
+        if moving_target:
+            board.exploreMove((row, dim-1-row))
+    for _ in range(WARMUP):
+        call(board)
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        call(board)
+        times.append(time.perf_counter() - start)
+    return {"seconds": float(np.median(times)), "min": float(np.min(times)), "repeats": REPEATS}
+
+def benchmarkAgent(name: str, dim: int) -> dict:
+    '''Mean seconds per run of an agent over the fixed seeds, with the action count of each run'''
+    agent, board_kwargs, kwargs = AGENTS[name]
+    times = []
+    actions = []
+    for seed in AGENT_SEEDS:
+        board = Board(dim, rng=seed, **board_kwargs)
+        start = time.perf_counter()
+        actions.append(int(agent(board, **kwargs)))
+        times.append(time.perf_counter() - start)
+    return {"seconds": float(np.mean(times)), "min": float(np.min(times)), "repeats": len(times), "actions": actions}
+
+def runSuite(board_dims: list) -> dict:
+    results = {}
+    for name in BOARD_METHODS:
+        for dim in board_dims:
+            key = f"board/{name}/dim={dim}"
+            results[key] = benchmarkBoard(name, dim)
+            print(f"{key}: {results[key]['seconds']:.3g}s")
+    for name in AGENTS:
+        for dim in AGENT_DIMS:
+            key = f"agent/{name}/dim={dim}"
+            results[key] = benchmarkAgent(name, dim)
+            print(f"{key}: {results[key]['seconds']:.3g}s")
+    meta = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine()}
+    return {"meta": meta, "results": results}
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    '''returns a list of (key, message) for every result that got slower than threshold allows or changed its actions'''
+    flagged = []
+    for key, base in baseline["results"].items():
+        if key not in current["results"]:
+            flagged.append((key, "missing from current results"))
+            continue
+        result = current["results"][key]
+        ratio = result["seconds"] / base["seconds"] if base["seconds"] > 0 else np.inf
+        if ratio > 1 + threshold:
+            flagged.append((key, f"{ratio:.2f}x slower ({base['seconds']:.3g}s -> {result['seconds']:.3g}s)"))
+        if base.get("actions") != result.get("actions"):
+            flagged.append((key, f"actions changed {base.get('actions')} -> {result.get('actions')}"))
+    return flagged
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    if len(args) >= 2 and args[0] == "run":
+        dims = [int(arg) for arg in args[2:]] if len(args) > 2 else BOARD_DIMS
+        with open(args[1], "w") as output:
+            json.dump(runSuite(dims), output, indent=1)
+        return 0
+    if len(args) in (3, 4) and args[0] == "compare":
+        with open(args[1]) as baseline_file, open(args[2]) as current_file:
+            baseline, current = json.load(baseline_file), json.load(current_file)
+        flagged = compare(baseline, current, float(args[3]) if len(args) == 4 else 0.2)
+        for key, message in flagged:
+            print(f"REGRESSION {key}: {message}")
+        print(f"{len(flagged)} regression(s) in {len(baseline['results'])} results")
+        return 1 if flagged else 0
+    print(__doc__)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
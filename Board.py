@@ -1,9 +1,19 @@
 '''Board representation'''
 
-from random import choice
+from functools import partial
 
 import numpy as np
 
+import BeliefFilter
+import Diamond
+import Team
+from MaxTree import MaxTree
+from RangeMax import DiamondMax
+from Storage import PROFILES, FIND_RATES, MISS_RATES, TERRAIN_WEIGHTS, UNIFORM_BUFFER, LookupMask, checkSensorModel, generateTerrain, makeRng
+from Tiles import TileIndex, tiledDistanceSearch
+from RowBlocks import RowBlocks
+from RingSearch import ringSearch, distanceWeight, weightedDistance
+
 FLAT = 0
 HILL = 1
 FOREST = 2
@@ -13,102 +23,342 @@ FOUND = 1
 MISSING = 0
 
 BLOCK = 999999999 #Arbitrary large value to prevent selection
+NEARBY_RADIUS = 5 #Manhattan distance within which exploreMove reports the target as nearby
+#(scale, offset) of the bestWeightedDist and bestWeightedDist2 weights, max(1, scale*(distance + 1) - offset)
+DISTANCE_WEIGHTS = ((1.0, 5.0), (0.5, 5.0))
+
+#Changes of the board state written to its journal (see Trajectory.py), each with two integer arguments
+EXPLORED = 0 #flat cell
+UPDATED = 1 #flat cell
+TARGET_MOVED = 2 #flat target, whether a uniform was drawn
+CLEARED_AROUND = 3 #flat cell
+NEARBY = 4 #flat cell, radius
+CLOCK_TICK = 5
+CONDITIONED = 6 #flat cell, -1 without a signal or else 2*radius + signal
+PREDICTED = 7 #steps, fft
 
 class Board:
     '''Representation of the landscape'''
 
-    def __init__(self, dim: int, copy_board=None, copy_target=None, moving_target=False):
+    def __init__(self, dim: int, copy_board=None, copy_target=None, moving_target=False, indexed=False, ring_search=False, belief_filter=False, storage="default", belief=None, tile=None, rng=None, terrain_weights=None, false_negative_rates=None, board_mask=None, local_index=False, nearby_radius=NEARBY_RADIUS, distance_weights=DISTANCE_WEIGHTS, threads=None):
+        if tile is not None and moving_target:
+            #The cleared cell scans of the moving queries would build full board temporaries, defeating the tiles
+            raise ValueError("Tiled queries are not supported with a moving target")
         self.dim = dim
+        self._storage = storage
+        terrain_dtype, belief_dtype, cleared_dtype, stored_mask = PROFILES[storage]
+        self.rng = makeRng(rng) #Every random draw of this board, pass a seed to reproduce a run
+        self._uniforms = []
+        self._next_uniform = 0
+        #Sensor model, indexed by terrain code
+        if false_negative_rates is None:
+            self._find_rates, self._miss_rates = np.array(FIND_RATES), np.array(MISS_RATES)
+        else:
+            self._miss_rates = np.array(false_negative_rates, dtype=float)
+            self._find_rates = 1 - self._miss_rates
+        if terrain_weights is None:
+            terrain_weights = TERRAIN_WEIGHTS
+        checkSensorModel(terrain_weights if copy_board is None else None, self._miss_rates) #Every generated terrain code needs a find rate
         if copy_board is None:
-            self._board = np.random.choice([FLAT,HILL,FOREST,CAVE], (dim, dim), True, [0.2,0.3,0.3,0.2])
-            self.target = (int(np.random.randint(dim)), int(np.random.randint(dim))) #position of the target
+            self._board = generateTerrain(dim, terrain_dtype, rng=self.rng, weights=terrain_weights)
+            self.target = (int(self.rng.integers(dim)), int(self.rng.integers(dim))) #position of the target
         else:
-            self._board = copy_board
+            self._board = copy_board if stored_mask else np.asarray(copy_board, dtype=terrain_dtype)
             self.target = copy_target
-        self.board = np.full((dim,dim),1/(dim**2)) #probability of each cell being the target
-        self._board_mask = np.ones((dim, dim)) #Probability that you successfully find if they are in the cell
-        self._board_mask[self._board == FLAT] *= 0.9
-        self._board_mask[self._board == HILL] *= 0.7
-        self._board_mask[self._board == FOREST] *= 0.3
-        self._board_mask[self._board == CAVE] *= 0.1
+        if belief is None:
+            self.board = np.full((dim,dim),1/(dim**2), dtype=belief_dtype) #probability of each cell being the target
+        else:
+            self.board = belief #Caller provided, e.g. a memory map from Tiles.openBelief
+        if stored_mask and board_mask is not None:
+            self._board_mask = board_mask #Precomputed, e.g. from a scenario corpus, must match the find rates of the terrain
+        elif stored_mask and not isinstance(self._board, np.memmap): #A memory mapped terrain may not fit in RAM, nor would its mask
+            self._board_mask = np.take(self._find_rates, self._board) #Probability that you successfully find if they are in the cell
+        else:
+            self._board_mask = LookupMask(self._board, self._find_rates.astype(belief_dtype))
+        self._moving = moving_target
+        self._nearby_radius = nearby_radius
+        self._distance_weights = tuple((float(scale), float(offset)) for scale, offset in distance_weights)
+        self._weights = [partial(weightedDistance, scale=scale, offset=offset) for scale, offset in self._distance_weights]
         if moving_target:
-            self._known_cleared = np.zeros((dim, dim))
+            #A cell is cleared while its timestamp is after the clock, so a step only advances the clock
+            self._cleared_until = np.zeros((dim, dim), dtype=cleared_dtype)
+            self._clock = 0
+            #Timestamps are relative to the last rebase, which happens once the clock reaches half the dtype range. Turns
+            #past the other half saturate, which only lets cells back into the search earlier
+            self._rebase_at = np.iinfo(cleared_dtype).max // 2
+            self._expiring = {} #Indexed or locally indexed boards only, timestamp: flat cells that may open at it
+        self._ring_search = ring_search #Distance heuristics search outward from the current cell, bounded by the indexed max
+        self._indexed = indexed or ring_search
+        if self._indexed: #Maintain argmax trees so bestContains/bestFind(Moving) don't rescan the board
+            self._buildIndex()
+        self._local_indexed = local_index
+        if self._local_indexed: #Maintain diamond max pyramids so bestLocal(2)(Moving) don't rescan the window
+            self._buildLocalIndex()
+        self._tracked = self._indexed or self._local_indexed #Something has to hear when cleared cells open again
+        self._tiled = tile is not None
+        if self._tiled: #Cache per tile maxima so queries only rescan tiles that changed, e.g. for disk backed boards
+            self._contains_tiles = TileIndex(dim, tile, lambda rows, cols: self.board[rows, cols])
+            self._find_tiles = TileIndex(dim, tile, lambda rows, cols: self.board[rows, cols] * self._board_mask[rows, cols])
+        self._row_blocks = None
+        if threads is not None: #Split bestFind(Moving)/bestDistNumpy scans into row blocks run on a thread pool
+            self._row_blocks = RowBlocks(dim, self.board.dtype, threads)
+        self._journal = None #Set by a Trajectory.Recorder to log every change of the board state
+        if belief_filter: #Belief follows the target with observe/predict instead of relying on the cleared cells
+            self._inv_degree = BeliefFilter.inverseDegree(dim).astype(belief_dtype)
+            self._filter_scratch = np.empty((dim, dim), dtype=belief_dtype)
+
+    def _buildIndex(self) -> None:
+        '''Build the argmax trees from the whole board'''
+        self._contains_tree = MaxTree(self.board)
+        self._find_tree = MaxTree(self.board * self._board_mask)
+        if self._moving:
+            open_cells = self._cleared_until <= self._clock
+            self._contains_moving_tree = MaxTree(self.board * open_cells)
+            self._find_moving_tree = MaxTree(self.board * self._board_mask * open_cells)
+        return
+
+    def _buildLocalIndex(self) -> None:
+        '''Build the diamond max pyramids from the whole board'''
+        self._local_contains = DiamondMax(self.dim, lambda rows, cols: self.board[rows, cols])
+        self._local_find = DiamondMax(self.dim, lambda rows, cols: self.board[rows, cols] * self._board_mask[rows, cols])
+        if self._moving:
+            self._local_contains_moving = DiamondMax(self.dim, lambda rows, cols: self.board[rows, cols] * (self._cleared_until[rows, cols] <= self._clock))
+            self._local_find_moving = DiamondMax(self.dim, lambda rows, cols: self.board[rows, cols] * self._board_mask[rows, cols] * (self._cleared_until[rows, cols] <= self._clock))
+        return
+
+    def _reindexLocal(self, flat: np.ndarray) -> None:
+        '''Refresh the diamond max pyramids after the belief of the given cells changed'''
+        self._local_contains.update(flat)
+        self._local_find.update(flat)
+        if self._moving:
+            self._local_contains_moving.update(flat)
+            self._local_find_moving.update(flat)
+        return
+
+    def _reindex(self, pos: tuple) -> None:
+        '''Refresh the argmax trees after the belief of a single cell changed'''
+        row, col = pos
+        flat = row*self.dim + col
+        contains = self.board[row][col]
+        find = contains * self._board_mask[row][col]
+        self._contains_tree.update(flat, contains)
+        self._find_tree.update(flat, find)
+        if self._moving:
+            open_cell = self._cleared_until[row][col] <= self._clock
+            self._contains_moving_tree.update(flat, contains * open_cell)
+            self._find_moving_tree.update(flat, find * open_cell)
+        return
+
+    def _reindexCleared(self, flat: np.ndarray) -> None:
+        '''Refresh the moving argmax trees and pyramids after cells entered or left the cleared set'''
+        if self._indexed:
+            contains = self.board.ravel()[flat]
+            open_cells = self._cleared_until.ravel()[flat] <= self._clock
+            self._contains_moving_tree.updateMany(flat, contains * open_cells)
+            self._find_moving_tree.updateMany(flat, contains * self._board_mask.ravel()[flat] * open_cells)
+        if self._local_indexed and len(flat):
+            self._local_contains_moving.update(flat)
+            self._local_find_moving.update(flat)
+        return
+
+    def _scheduleExpiry(self, flat: np.ndarray) -> None:
+        '''Remember when cells that were just cleared open again, so the moving argmax trees and pyramids can be told then'''
+        if len(flat) == 0:
+            return
+        until = self._cleared_until.ravel()[flat]
+        order = np.argsort(until, kind='stable')
+        until, flat = until[order], flat[order]
+        starts = np.flatnonzero(np.r_[True, until[1:] != until[:-1]])
+        for start, end in zip(starts, np.r_[starts[1:], len(until)]):
+            self._expiring.setdefault(int(until[start]), []).append(flat[start:end])
+        return
+
+    def _rebuildExpiry(self) -> None:
+        '''Schedule every cleared cell again, after the whole cleared map was replaced'''
+        self._expiring = {}
+        if self._tracked:
+            self._scheduleExpiry(np.flatnonzero(self._cleared_until > self._clock))
+        return
+
+    def _rebase(self) -> None:
+        '''Shift the timestamps so the clock is 0 again, keeping them within the dtype'''
+        cleared = self._cleared_until > self._clock
+        np.subtract(self._cleared_until, self._clock, out=self._cleared_until, where=cleared)
+        self._cleared_until[~cleared] = 0
+        self._expiring = {until - self._clock: cells for until, cells in self._expiring.items() if until > self._clock}
+        self._clock = 0
+        return
+
+    def clearedTurns(self) -> np.ndarray:
+        '''Turns until each cell can hold the target again, 0 for cells that are not cleared'''
+        return np.maximum(self._cleared_until.astype(np.int64) - self._clock, 0)
+
+    def _uniform(self) -> float:
+        '''Next uniform from the board's generator, drawn in buffers to avoid a generator call per draw'''
+        if self._next_uniform == len(self._uniforms):
+            self._uniforms = self.rng.random(UNIFORM_BUFFER).tolist()
+            self._next_uniform = 0
+        self._next_uniform += 1
+        return self._uniforms[self._next_uniform-1]
 
     def explore(self, pos: tuple) -> int:
+        if self._journal is not None:
+            self._journal.append(EXPLORED, pos[0]*self.dim + pos[1], 0)
         if pos[0] < 0 or pos[1] < 0 or pos[0] >= self.dim or pos[1] >= self.dim:
             return -1 #invalid
         if not self.target == pos:
             return MISSING
-        terrain = self._board[pos[0]][pos[1]]
-        if terrain == FLAT:
-            return np.random.choice([0,1],1,False,[0.1,0.9])
-        if terrain == HILL:
-            return np.random.choice([0,1],1,False,[0.3,0.7])
-        if terrain == FOREST:
-            return np.random.choice([0,1],1,False,[0.7,0.3])
-        if terrain == CAVE:
-            return np.random.choice([0,1],1,False,[0.9,0.1])
-        return -1 #should never reach here
+        return FOUND if self._uniform() < self._find_rates[self._board[pos[0]][pos[1]]] else MISSING
 
     def update_probability(self, pos: tuple) -> None:
         '''Update the board probabilities after exploring the cell'''
-        if self._board[pos[0]][pos[1]] == FLAT:
-            self.board[pos[0]][pos[1]] *= 0.1
-        elif self._board[pos[0]][pos[1]] == HILL:
-            self.board[pos[0]][pos[1]] *= 0.3
-        elif self._board[pos[0]][pos[1]] == FOREST:
-            self.board[pos[0]][pos[1]] *= 0.7
+        if self._journal is not None:
+            self._journal.append(UPDATED, pos[0]*self.dim + pos[1], 0)
+        self.board[pos[0]][pos[1]] *= self._miss_rates[self._board[pos[0]][pos[1]]]
+        if self._indexed:
+            self._reindex(pos)
+        if self._local_indexed:
+            self._reindexLocal(np.array([pos[0]*self.dim + pos[1]]))
+        if self._tiled:
+            self._contains_tiles.markDirty(pos)
+            self._find_tiles.markDirty(pos)
+        return
+
+    def update_probabilities(self, cells: np.ndarray) -> None:
+        '''update_probability for many distinct cells at once, given as flat indices'''
+        if self._journal is not None:
+            for cell in cells:
+                self._journal.append(UPDATED, cell, 0)
+        rows, cols = np.divmod(cells, self.dim)
+        self.board[rows, cols] *= self._miss_rates[self._board[rows, cols]]
+        if self._indexed:
+            contains = self.board[rows, cols]
+            self._contains_tree.updateMany(cells, contains)
+            self._find_tree.updateMany(cells, contains * self._board_mask[rows, cols])
+        if self._local_indexed:
+            self._local_contains.update(cells)
+            self._local_find.update(cells)
+        if self._moving and self._tracked:
+            self._reindexCleared(cells) #Moving argmax trees and pyramids
+        if self._tiled:
+            self._contains_tiles.markDirty((rows, cols))
+            self._find_tiles.markDirty((rows, cols))
+        return
+
+    def observe(self, pos: tuple, target_nearby=None, radius=None) -> None:
+        '''Belief filter update after failing to find the target at pos, target_nearby is the exploreMove signal if there is one'''
+        if radius is None:
+            radius = self._nearby_radius
+        self.update_probability(pos)
+        self._condition(pos, target_nearby, radius)
+        return
+
+    def _condition(self, pos: tuple, target_nearby, radius: int) -> None:
+        '''The belief filter part of observe that follows the update of the searched cell'''
+        if self._journal is not None:
+            self._journal.append(CONDITIONED, pos[0]*self.dim + pos[1], -1 if target_nearby is None else 2*radius + bool(target_nearby))
+        if target_nearby is not None:
+            #The target is within radius of pos exactly when the signal says so
+            near = Diamond.distances(self.dim, pos) <= radius
+            self.board *= near if target_nearby else ~near
+        self.board /= self.board.sum()
+        self._beliefReplaced()
+        return
+
+    def _beliefReplaced(self) -> None:
+        '''Rebuild every cached query structure after the whole belief changed'''
+        if self._indexed:
+            self._buildIndex()
+        if self._local_indexed:
+            self._buildLocalIndex()
+        if self._tiled:
+            self._contains_tiles.markAll()
+            self._find_tiles.markAll()
+        return
+
+    def predict(self, steps=1, fft=False) -> None:
+        '''Belief filter update for the target walking steps times, fft trades exactness at the edges for one pass on long walks'''
+        if self._journal is not None:
+            self._journal.append(PREDICTED, steps, int(fft))
+        if self.dim == 1: #Nowhere to walk
+            return
+        #Written back into the belief array itself, so it keeps its dtype and a memory mapped belief stays on its file
+        if fft:
+            self.board[...] = BeliefFilter.randomWalkFFT(self.board, steps)
+            self.board /= self.board.sum()
         else:
-            self.board[pos[0]][pos[1]] *= 0.9
+            for _ in range(steps):
+                np.copyto(self.board, BeliefFilter.randomWalkStep(self.board, self._inv_degree, self._filter_scratch))
+        self._beliefReplaced()
         return
 
     def target_movement(self, update_cleared=True) -> None:
         '''Move the target when there is a new action'''
         neighbors = self.getNeighbors(self.target)
         if len(neighbors) > 0:
-            self.target = choice(neighbors)
+            self.target = neighbors[int(self._uniform() * len(neighbors))]
+        if self._journal is not None:
+            self._journal.append(TARGET_MOVED, self.target[0]*self.dim + self.target[1], int(len(neighbors) > 0))
         if update_cleared:
             self.update_cleared_cells()
         return
 
     def update_cleared_cells(self) -> None:
-        '''Update the cleared cells matrix upon another action'''
-        self._known_cleared = np.maximum(np.zeros((self.dim, self.dim)), self._known_cleared - 1)
+        '''Update the cleared cells upon another action, every timestamp comes one step closer by advancing the clock'''
+        if self._journal is not None:
+            self._journal.append(CLOCK_TICK, 0, 0)
+        self._clock += 1
+        if self._tracked and self._clock in self._expiring:
+            flat = np.concatenate(self._expiring.pop(self._clock))
+            self._reindexCleared(flat[self._cleared_until.ravel()[flat] == self._clock]) #Others were cleared again since
+        if self._clock >= self._rebase_at:
+            self._rebase()
         return
 
     def exploreMove(self, pos: tuple) -> tuple:
-        '''explore for moving targets, returns a tuple containing (found/missing target, bool of whether the target is within 5 manhattan distance)'''
+        '''explore for moving targets, returns a tuple containing (found/missing target, bool of whether the target is within nearby_radius manhattan distance)'''
         if pos[0] < 0 or pos[1] < 0 or pos[0] >= self.dim or pos[1] >= self.dim:
             return -1 #invalid
-        if not self.target == pos:
-            ret = 0
-        else:
-            terrain = self._board[pos[0]][pos[1]]
-            if terrain == FLAT:
-                ret = np.random.choice([0,1],1,False,[0.1,0.9])
-            elif terrain == HILL:
-                ret = np.random.choice([0,1],1,False,[0.3,0.7])
-            elif terrain == FOREST:
-                ret = np.random.choice([0,1],1,False,[0.7,0.3])
-            else:
-                ret = np.random.choice([0,1],1,False,[0.9,0.1])
-        if ret == 0:
-            if self.manhattan(pos, self.target) > 5:
-                #Prevent these cells from being visited again soon, poor python implementation - hopefully can find a proper numpy implementation
-                neighborhood = [(row, col) for row in range(max(0, pos[0]-5), min(self.dim, pos[0]+6)) for col in range(max(0, pos[1]-5), min(self.dim, pos[1]+6)) if (abs(row-pos[0]) + abs(col-pos[1])) <= 5]
-                for neighbor in neighborhood:
-                    row, col = neighbor
-                    self._known_cleared[row][col] = 5 - self.manhattan(neighbor, pos) #Number of turns until the target can walk to the position
+        ret = self.explore(pos)
+        if ret == MISSING:
+            if self.manhattan(pos, self.target) > self._nearby_radius:
+                self._clearAround(pos)
                 return (False, False)
             return (False, True)
         return (True, True)
     
-    def isNearby(self, pos: tuple, radius=5) -> None:
-        '''Restrict search space to cells that are nearby'''
-        far_cells = [(row, col) for row in range(self.dim) for col in range(self.dim) if (abs(row-pos[0]) + abs(col-pos[1])) > radius]
-        for far_cell in far_cells:
-            row, col = far_cell
-            self._known_cleared[row][col] = max(self._known_cleared[row][col], self.manhattan(far_cell, pos)-(radius+1)) #Number of turns until the target can walk to the position
+    def _clearAround(self, pos: tuple) -> None:
+        '''Prevent the cells around pos from being visited again soon, after the target was not nearby'''
+        if self._journal is not None:
+            self._journal.append(CLEARED_AROUND, pos[0]*self.dim + pos[1], 0)
+        board_slices, distance, inside = Diamond.window(self.dim, pos, self._nearby_radius)
+        cleared = self._cleared_until[board_slices]
+        cleared[inside] = self._clock + self._nearby_radius - distance[inside] #Cleared until the target can walk to the position
+        if self._tracked:
+            rows, cols = np.nonzero(inside)
+            flat = (rows + board_slices[0].start)*self.dim + cols + board_slices[1].start
+            self._reindexCleared(flat)
+            self._scheduleExpiry(flat)
+        return
+
+    def isNearby(self, pos: tuple, radius=None) -> None:
+        '''Restrict search space to cells that are nearby, within nearby_radius unless given'''
+        if radius is None:
+            radius = self._nearby_radius
+        if self._journal is not None:
+            self._journal.append(NEARBY, pos[0]*self.dim + pos[1], radius)
+        #Step until which the target can't walk to the position, cells within radius are before the clock and left as is
+        until = Diamond.distances(self.dim, pos, np.int32 if self._clock + 2*self.dim < np.iinfo(np.int32).max else np.int64)
+        until += self._clock - (radius+1)
+        latest = np.iinfo(self._cleared_until.dtype).max
+        if self._clock + 2*self.dim > latest:
+            np.minimum(until, latest, out=until)
+        if self._tracked:
+            flat = np.flatnonzero((until > self._cleared_until) & (until > self._clock)) #Cells cleared for longer
+        np.maximum(self._cleared_until, until, out=self._cleared_until, casting='unsafe')
+        if self._tracked:
+            self._reindexCleared(flat)
+            self._scheduleExpiry(flat)
         return
 
     def getNeighbors(self, pos: tuple) -> list:
@@ -136,91 +386,154 @@ class Board:
 
     def bestContains(self) -> tuple:
         '''returns cell with best chance of containing the target'''
-        max_pos = self.board.argmax()
+        if self._indexed:
+            max_pos = self._contains_tree.argmax()
+        elif self._tiled:
+            max_pos = self._contains_tiles.argmax()
+        else:
+            max_pos = self.board.argmax()
         return max_pos//self.dim, max_pos % self.dim
 
     def bestContainsMoving(self) -> tuple:
         '''Returns cell with best chance out of cells that are not cleared'''
-        search_board = self.board * (self._known_cleared == 0)
-        max_pos = search_board.argmax()
+        if self._indexed:
+            max_pos = self._contains_moving_tree.argmax()
+        else:
+            search_board = self.board * (self._cleared_until <= self._clock)
+            max_pos = search_board.argmax()
         return max_pos//self.dim, max_pos % self.dim
 
     def bestFind(self) -> tuple:
         '''returns cell with best chance of finding the target'''
-        temp = np.multiply(self.board, self._board_mask)
-        max_pos = temp.argmax()
+        if self._indexed:
+            max_pos = self._find_tree.argmax()
+        elif self._tiled:
+            max_pos = self._find_tiles.argmax()
+        elif self._row_blocks is not None:
+            max_pos = self._row_blocks.findArgmax(self.board, self._board_mask)
+        else:
+            temp = np.multiply(self.board, self._board_mask)
+            max_pos = temp.argmax()
         return max_pos//self.dim, max_pos % self.dim
     
     def bestFindMoving(self) -> tuple:
         '''Returns cell with best chance out of cells that are not cleared'''
-        search_board = np.multiply(self.board, self._board_mask) * (self._known_cleared == 0)
-        max_pos = search_board.argmax()
+        if self._indexed:
+            max_pos = self._find_moving_tree.argmax()
+        elif self._row_blocks is not None:
+            max_pos = self._row_blocks.findArgmax(self.board, self._board_mask, self._cleared_until, self._clock)
+        else:
+            search_board = np.multiply(self.board, self._board_mask)
+            search_board *= self._cleared_until <= self._clock
+            max_pos = search_board.argmax()
         return max_pos//self.dim, max_pos % self.dim
 
-    def bestDistNumpy(self, pos) -> tuple:
-        x_target, y_target = pos
-        col_diff, row_diff = np.abs(np.mgrid[-x_target:self.dim-x_target, -y_target:self.dim-y_target])
-        distance_mask = col_diff + row_diff + 1
-        scores = np.divide(distance_mask, self.board*self._board_mask)
+    def bestContainsK(self, k: int) -> np.ndarray:
+        '''Flat indices of the k cells with the best chance of containing the target, best first (ties to the lowest index)'''
+        return Team.smallest(-self.board.ravel(), k)[0]
+
+    def bestFindK(self, k: int) -> np.ndarray:
+        '''Flat indices of the k cells with the best chance of finding the target, best first (ties to the lowest index)'''
+        return Team.smallest(-np.multiply(self.board, self._board_mask).ravel(), k)[0]
+
+    def bestDistK(self, positions: np.ndarray) -> np.ndarray:
+        '''bestDistNumpy for a team at flat positions, returns a distinct flat cell for every searcher'''
+        candidates, costs = Team.distanceCandidates(np.multiply(self.board, self._board_mask), positions, len(positions))
+        return Team.assign(candidates, costs)
+
+    def _distanceMask(self, pos) -> np.ndarray:
+        '''Fresh array of (manhattan distance from pos) + 1 in the belief dtype'''
+        distance_mask = Diamond.distances(self.dim, pos, self.board.dtype)
+        distance_mask += 1
+        return distance_mask
+
+    def _distanceScores(self, distance_mask: np.ndarray) -> tuple:
+        '''Divide distance_mask in place by the chance of finding the target and return the cell with the lowest score'''
+        with np.errstate(divide='ignore', over='ignore'): #Zero beliefs (the belief filter) and float32 underflow give inf scores, ranked last
+            scores = np.divide(distance_mask, np.multiply(self.board, self._board_mask), out=distance_mask)
         min_pos = scores.argmin()
         return min_pos // self.dim, min_pos % self.dim
 
+    def bestDistNumpy(self, pos) -> tuple:
+        if self._ring_search:
+            return ringSearch(self.board, self._board_mask, pos, distanceWeight, self._find_tree.max())
+        if self._tiled:
+            return tiledDistanceSearch(self.board, self._board_mask, pos, distanceWeight, self._find_tiles)
+        if self._row_blocks is not None:
+            min_pos = self._row_blocks.distArgmin(self.board, self._board_mask, pos)
+            return min_pos // self.dim, min_pos % self.dim
+        return self._distanceScores(self._distanceMask(pos))
+
     def bestDistMoving(self, pos) -> tuple:
         '''(Manhattan Distance)/(Probability) heuristic with moving target'''
-        x_target, y_target = pos
-        col_diff, row_diff = np.abs(np.mgrid[-x_target:self.dim-x_target, -y_target:self.dim-y_target])
-        distance_mask = col_diff + row_diff + 1
-        distance_mask = distance_mask * np.where(self._known_cleared == 0, 1, BLOCK) #Prevent those which have been cleared from being chosen
-        scores = np.divide(distance_mask, self.board*self._board_mask)
-        min_pos = scores.argmin()
-        return min_pos // self.dim, min_pos % self.dim
+        if self._ring_search:
+            return ringSearch(self.board, self._board_mask, pos, distanceWeight, self._find_tree.max(), self._cleared_until, BLOCK, clock=self._clock)
+        distance_mask = self._distanceMask(pos)
+        distance_mask[self._cleared_until > self._clock] *= BLOCK #Prevent those which have been cleared from being chosen
+        return self._distanceScores(distance_mask)
 
     def bestWeightedDist(self, pos) -> tuple:
         '''Utilizes a similar manhattan dist/probability heuristic, but weighted'''
-        x_target, y_target = pos
-        col_diff, row_diff = np.abs(np.mgrid[-x_target:self.dim-x_target, -y_target:self.dim-y_target])
-        distance_mask = col_diff + row_diff + 1
-        distance_mask = np.maximum(np.ones((self.dim, self.dim)), distance_mask-5)
-        scores = np.divide(distance_mask, self.board*self._board_mask)
-        min_pos = scores.argmin()
-        return min_pos // self.dim, min_pos % self.dim
+        if self._ring_search:
+            return ringSearch(self.board, self._board_mask, pos, self._weights[0], self._find_tree.max())
+        if self._tiled:
+            return tiledDistanceSearch(self.board, self._board_mask, pos, self._weights[0], self._find_tiles)
+        distance_mask = self._distanceMask(pos)
+        scale, offset = self._distance_weights[0]
+        if scale != 1:
+            distance_mask *= scale
+        distance_mask -= offset
+        np.maximum(distance_mask, 1, out=distance_mask)
+        return self._distanceScores(distance_mask)
 
     def bestWeightedDist2(self, pos) -> tuple:
         '''Utilizes a similar manhattan dist/probability heuristic, but weighted'''
-        x_target, y_target = pos
-        col_diff, row_diff = np.abs(np.mgrid[-x_target:self.dim-x_target, -y_target:self.dim-y_target])
-        distance_mask = (col_diff + row_diff + 1) * 0.5
-        distance_mask = np.maximum(np.ones((self.dim, self.dim)), distance_mask-5)
-        scores = np.divide(distance_mask, self.board*self._board_mask)
-        min_pos = scores.argmin()
-        return min_pos // self.dim, min_pos % self.dim
+        if self._ring_search:
+            return ringSearch(self.board, self._board_mask, pos, self._weights[1], self._find_tree.max())
+        if self._tiled:
+            return tiledDistanceSearch(self.board, self._board_mask, pos, self._weights[1], self._find_tiles)
+        distance_mask = self._distanceMask(pos)
+        scale, offset = self._distance_weights[1]
+        if scale != 1:
+            distance_mask *= scale
+        distance_mask -= offset
+        np.maximum(distance_mask, 1, out=distance_mask)
+        return self._distanceScores(distance_mask)
 
     def bestLocal(self, pos, x:int) -> tuple:
         '''Rule 1 implementation - Returns cell with highest chance of containing target within radius x around pos'''
-        #Generate all valid neighbors
-        neighborhood = [(row, col) for row in range(max(0, pos[0]-x), min(self.dim, pos[0]+x+1)) for col in range(max(0, pos[1]-x), min(self.dim, pos[1]+x+1)) if (abs(row-pos[0]) + abs(col-pos[1])) <= x]
-        return max(neighborhood, key = lambda y: self.board[y[0]][y[1]]) #Return index with max probability
+        if self._local_indexed and self._local_contains.worthIt(pos, x):
+            return self._local_contains.query(pos, x)
+        board_slices, _, inside = Diamond.window(self.dim, pos, x)
+        return Diamond.bestInWindow(self.board[board_slices], inside, board_slices) #Return index with max probability
     
     def bestLocalMoving(self, pos, x:int) -> tuple:
         '''Rule 1 implementation - Returns cell with highest chance of containing target within radius x around pos'''
-        #Generate all valid neighbors
-        neighborhood = [(row, col) for row in range(max(0, pos[0]-x), min(self.dim, pos[0]+x+1)) for col in range(max(0, pos[1]-x), min(self.dim, pos[1]+x+1)) if (abs(row-pos[0]) + abs(col-pos[1])) <= x]
-        return max(neighborhood, key = lambda y: self.board[y[0]][y[1]] * (self._known_cleared[y[0]][y[1]] == 0)) #Return index with max probability
+        if self._local_indexed and self._local_contains_moving.worthIt(pos, x):
+            return self._local_contains_moving.query(pos, x)
+        board_slices, _, inside = Diamond.window(self.dim, pos, x)
+        scores = self.board[board_slices] * (self._cleared_until[board_slices] <= self._clock)
+        return Diamond.bestInWindow(scores, inside, board_slices) #Return index with max probability
 
     def bestLocal2(self, pos, x:int) -> tuple:
         '''Rule 2 implementation - Returns cell with highest chance of finding target within radius x around pos'''
-        #Generate all valid neighbors
-        neighborhood = [(row, col) for row in range(max(0, pos[0]-x), min(self.dim, pos[0]+x+1)) for col in range(max(0, pos[1]-x), min(self.dim, pos[1]+x+1)) if (abs(row-pos[0]) + abs(col-pos[1])) <= x]
-        return max(neighborhood, key = lambda y: self.board[y[0]][y[1]]*self._board_mask[y[0]][y[1]]) #Return index with max probability
+        if self._local_indexed and self._local_find.worthIt(pos, x):
+            return self._local_find.query(pos, x)
+        board_slices, _, inside = Diamond.window(self.dim, pos, x)
+        scores = self.board[board_slices] * self._board_mask[board_slices]
+        return Diamond.bestInWindow(scores, inside, board_slices) #Return index with max probability
     
     def bestLocal2Moving(self, pos, x:int) -> tuple:
         '''Rule 2 implementation - Returns cell with highest chance of finding target within radius x around pos'''
-        #Generate all valid neighbors
-        neighborhood = [(row, col) for row in range(max(0, pos[0]-x), min(self.dim, pos[0]+x+1)) for col in range(max(0, pos[1]-x), min(self.dim, pos[1]+x+1)) if (abs(row-pos[0]) + abs(col-pos[1])) <= x]
-        return max(neighborhood, key = lambda y: self.board[y[0]][y[1]] * self._board_mask[y[0]][y[1]] * (self._known_cleared[y[0]][y[1]] == 0)) #Return index with max probability
+        if self._local_indexed and self._local_find_moving.worthIt(pos, x):
+            return self._local_find_moving.query(pos, x)
+        board_slices, _, inside = Diamond.window(self.dim, pos, x)
+        scores = self.board[board_slices] * self._board_mask[board_slices] * (self._cleared_until[board_slices] <= self._clock)
+        return Diamond.bestInWindow(scores, inside, board_slices) #Return index with max probability
 
     def bestLocal3(self, pos, x:int) -> tuple:
         '''Dist rule implementation - Returns cell with highest chance of finding target within radius x around pos'''
-        #Generate all valid neighbors
-        neighborhood = [(row, col) for row in range(max(0, pos[0]-x), min(self.dim, pos[0]+x+1)) for col in range(max(0, pos[1]-x), min(self.dim, pos[1]+x+1)) if (abs(row-pos[0]) + abs(col-pos[1])) <= x]
-        return min(neighborhood, key = lambda y: ((self.manhattan(pos, y)+1) * (((self._known_cleared[y[0]][y[1]] != 0) * BLOCK) + 1))/(self.board[y[0]][y[1]]*self._board_mask[y[0]][y[1]])) #Return index with max probability
\ No newline at end of file
+        board_slices, distance, inside = Diamond.window(self.dim, pos, x)
+        distance_mask = (distance + 1) * (((self._cleared_until[board_slices] > self._clock) * BLOCK) + 1)
+        scores = distance_mask / (self.board[board_slices] * self._board_mask[board_slices])
+        return Diamond.bestInWindow(scores, inside, board_slices, minimize=True) #Return index with min score
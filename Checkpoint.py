@@ -0,0 +1,124 @@
+'''Checkpointing of agent runs so an interrupted run can resume exactly where it stopped
+
+Agents call checkpoint.restore(board, agent) once before their loop and checkpoint.tick(board, agent, **state) at the
+top of every step of it, with the loop variables they need to carry on. Every few ticks the board state (belief,
+cleared map, target, generator state and the unused buffered uniforms) and the agent state are copied, and the copy
+is written to disk on a background thread, so the loop only waits for a memory copy. Files are written next to the
+checkpoint path and renamed into place, so a crash mid-write leaves the previous checkpoint intact. The terrain is not
+saved, so the board to resume on must be built the same way as the original (same seed or corpus scenario).
+
+Every checkpoint is a full snapshot rather than a delta on the previous one: a search step renormalizes the whole
+belief, so a delta would be as large as the snapshot anyway unless it replayed the board journal. The cost is a
+copy of the belief and cleared map on the agent's thread every `every` steps, about 2*dim**2 element copies so
+O(dim**2/every) per step, and one file of that size written per checkpoint off the hot loop.
+'''
+
+import json
+import os
+import threading
+
+import numpy as np
+
+
+class NullCheckpoint:
+    '''Checkpointing that does nothing, the default for every agent'''
+
+    def restore(self, board, agent: str):
+        return None
+
+    def tick(self, board, agent: str, **state) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+NO_CHECKPOINT = NullCheckpoint()
+
+
+class Checkpoint(NullCheckpoint):
+    '''Saves a run to path (an .npz file) every `every` steps, and resumes from it if it already exists'''
+
+    def __init__(self, path: str, every=1000):
+        self.path = path
+        self.every = every
+        self._ticks = 0
+        self._writer = None
+        self._error = None
+
+    def restore(self, board, agent: str):
+        '''Load the saved board state into board and return the saved agent state, None if there is nothing to resume'''
+        if not os.path.exists(self.path):
+            return None
+        with np.load(self.path) as saved:
+            meta = json.loads(str(saved["meta"]))
+            if meta["agent"] != agent:
+                raise Exception(f"Checkpoint {self.path} is for {meta['agent']}, not {agent}")
+            loadBoardState(board, saved, meta)
+        self._ticks = meta["ticks"]
+        return meta["state"]
+
+    def tick(self, board, agent: str, **state) -> None:
+        self._ticks += 1
+        if self._ticks % self.every:
+            return
+        arrays, meta = boardState(board)
+        meta.update(agent=agent, ticks=self._ticks, state={key: _plain(value) for key, value in state.items()})
+        arrays["meta"] = np.array(json.dumps(meta))
+        self.wait() #At most one write in flight
+        self._writer = threading.Thread(target=self._write, args=(arrays,), daemon=True)
+        self._writer.start()
+
+    def _write(self, arrays: dict) -> None:
+        try:
+            temporary = self.path + ".tmp.npz"
+            np.savez(temporary, **arrays)
+            os.replace(temporary, self.path)
+        except Exception as error: #Raised on the agent's thread by wait()
+            self._error = error
+
+    def wait(self) -> None:
+        '''Block until the pending write (if any) is on disk'''
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def end(self) -> None:
+        '''The run finished, so its checkpoint is removed and a rerun starts from scratch'''
+        self.wait()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def boardState(board) -> tuple:
+    '''(arrays, meta) copy of everything a run changes on a board, the meta part is JSON friendly'''
+    arrays = {"belief": np.array(board.board), "uniforms": np.array(board._uniforms[board._next_uniform:], dtype=np.float64)}
+    if board._moving:
+        arrays["cleared_until"] = board._cleared_until.copy()
+    meta = {"target": [int(coord) for coord in board.target], "rng": board.rng.bit_generator.state, "clock": board._clock if board._moving else 0}
+    return arrays, meta
+
+def loadBoardState(board, arrays, meta: dict) -> None:
+    '''Put a copy made by boardState back into a board built the same way, arrays can be any mapping such as an .npz'''
+    board.board[...] = arrays["belief"] #In place, so a memory mapped belief stays mapped
+    if board._moving:
+        board._cleared_until[...] = arrays["cleared_until"]
+        board._clock = meta["clock"]
+    board._uniforms = arrays["uniforms"].tolist()
+    board._next_uniform = 0
+    board.target = tuple(meta["target"])
+    board.rng.bit_generator.state = meta["rng"]
+    board._beliefReplaced() #Rebuild argmax trees and tile maxima from the restored belief
+    if board._moving:
+        board._rebuildExpiry()
+    return
+
+def _plain(value):
+    '''JSON friendly copy of an agent loop variable (ints, bools and cells)'''
+    if isinstance(value, (tuple, list, np.ndarray)):
+        return [_plain(item) for item in value]
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    return int(value)
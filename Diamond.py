@@ -0,0 +1,43 @@
+'''Precomputed manhattan diamond masks and distance tables for neighborhood queries'''
+
+from functools import lru_cache
+
+import numpy as np
+
+
+@lru_cache(maxsize=None)
+def diamond(radius: int) -> tuple:
+    '''returns (distance, inside) for the (2*radius+1)^2 square centered on the origin, both read-only'''
+    offsets = np.abs(np.arange(-radius, radius+1, dtype=np.int32))
+    distance = offsets[:, None] + offsets[None, :]
+    inside = distance <= radius
+    distance.setflags(write=False)
+    inside.setflags(write=False)
+    return distance, inside
+
+def distances(dim: int, pos: tuple, dtype=np.int32) -> np.ndarray:
+    '''returns a fresh (dim, dim) array of the manhattan distance from pos to every cell'''
+    row, col = int(pos[0]), int(pos[1]) #NumPy integer coordinates would promote a float32 dtype to float64
+    cells = np.arange(dim, dtype=dtype)
+    return np.add.outer(np.abs(cells - row), np.abs(cells - col))
+
+def window(dim: int, pos: tuple, radius: int) -> tuple:
+    '''returns (board slices, distance, inside) for the diamond of radius around pos clipped to the board
+
+    board slices index the bounding square on the board, distance and inside are views of the cached diamond with the
+    same shape.
+    '''
+    row, col = pos
+    row_start, row_end = max(0, row-radius), min(dim, row+radius+1)
+    col_start, col_end = max(0, col-radius), min(dim, col+radius+1)
+    distance, inside = diamond(radius)
+    diamond_slices = (slice(row_start-row+radius, row_end-row+radius), slice(col_start-col+radius, col_end-col+radius))
+    return (slice(row_start, row_end), slice(col_start, col_end)), distance[diamond_slices], inside[diamond_slices]
+
+def bestInWindow(scores: np.ndarray, inside: np.ndarray, board_slices: tuple, minimize=False) -> tuple:
+    '''returns the board cell of the first best score among cells inside the diamond, in row-major order'''
+    fill = np.inf if minimize else -np.inf
+    scores = np.where(inside, scores, fill)
+    best = scores.argmin() if minimize else scores.argmax()
+    width = scores.shape[1]
+    return board_slices[0].start + int(best // width), board_slices[1].start + int(best % width)
@@ -0,0 +1,99 @@
+'''Benchmark the moving target agents with the diamond kernels against the original list comprehension kernels
+
+Valid Arguments:
+    python3 DiamondBenchmark.py [<Steps> [<Board Dimension> ...]]
+    - Steps: number of explorations timed per agent run, default 20
+    - Board Dimension: default 100 500 1000
+'''
+import sys
+import time
+
+from Agent import moveRule1, moveRule2, moveAgent1, moveAgent2, moveAgent3, moveImprovedAgent
+from Board import Board
+
+
+class StepLimitedBoard(Board):
+    '''Board whose target is reported found after a fixed number of explorations, so every agent runs the same number of steps'''
+
+    def __init__(self, dim: int, steps: int, copy_board=None, copy_target=None, rng=None):
+        super().__init__(dim, copy_board, copy_target, moving_target=True, rng=rng)
+        self._steps_left = steps
+
+    def exploreMove(self, pos: tuple) -> tuple:
+        self._steps_left -= 1
+        if self._steps_left <= 0:
+            return (True, True)
+        return super().exploreMove(pos)
+
+
+class LegacyBoard(StepLimitedBoard):
+    '''Original list comprehension neighborhood kernels'''
+
+    def exploreMove(self, pos: tuple) -> tuple:
+        self._steps_left -= 1
+        if self._steps_left <= 0:
+            return (True, True)
+        found_target, target_nearby = (self.explore(pos) == 1), self.manhattan(pos, self.target) <= 5
+        if found_target:
+            return (True, True)
+        if not target_nearby:
+            neighborhood = [(row, col) for row in range(max(0, pos[0]-5), min(self.dim, pos[0]+6)) for col in range(max(0, pos[1]-5), min(self.dim, pos[1]+6)) if (abs(row-pos[0]) + abs(col-pos[1])) <= 5]
+            for neighbor in neighborhood:
+                row, col = neighbor
+                self._cleared_until[row][col] = self._clock + 5 - self.manhattan(neighbor, pos)
+            return (False, False)
+        return (False, True)
+
+    def isNearby(self, pos: tuple, radius=5) -> None:
+        far_cells = [(row, col) for row in range(self.dim) for col in range(self.dim) if (abs(row-pos[0]) + abs(col-pos[1])) > radius]
+        for far_cell in far_cells:
+            row, col = far_cell
+            self._cleared_until[row][col] = max(self._cleared_until[row][col], self._clock + self.manhattan(far_cell, pos)-(radius+1))
+        return
+
+
+def timeAgent(agent, board_type, dim: int, steps: int, seed: int) -> float:
+    '''Seconds per step of an agent on a seeded board'''
+    terrain = Board(dim, rng=seed)
+    #The uniform prior sends every agent to the corner first, a target next to it keeps the nearby kernels busy
+    board = board_type(dim, steps, terrain._board, (min(2, dim-1), min(2, dim-1)), seed)
+    start = time.perf_counter()
+    agent(board)
+    end = time.perf_counter()
+    return (end-start) / steps
+
+def timeKernel(kernel, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        kernel()
+    end = time.perf_counter()
+    return (end-start) / repeats
+
+def benchmarkKernels(dims: list, repeats: int) -> None:
+    print(f"{'Kernel':<20}{'Dim':>6}{'Legacy s/call':>16}{'Diamond s/call':>16}{'Speedup':>10}")
+    for dim in dims:
+        legacy = LegacyBoard(dim, repeats+1)
+        diamond = StepLimitedBoard(dim, repeats+1, legacy._board, (0, 0))
+        legacy.target = (0, 0)
+        pos = (dim//2, dim//2)
+        for name in ("exploreMove", "isNearby"):
+            legacy_time = timeKernel(lambda: getattr(legacy, name)(pos), repeats)
+            diamond_time = timeKernel(lambda: getattr(diamond, name)(pos), repeats)
+            print(f"{name:<20}{dim:>6}{legacy_time:>16.6f}{diamond_time:>16.6f}{legacy_time/diamond_time:>9.1f}x")
+
+def benchmark(dims: list, steps: int, seed=0) -> None:
+    benchmarkKernels(dims, steps)
+    print()
+    print(f"{'Agent':<20}{'Dim':>6}{'Legacy s/step':>16}{'Diamond s/step':>16}{'Speedup':>10}")
+    for agent in (moveRule1, moveRule2, moveAgent1, moveAgent2, moveAgent3, moveImprovedAgent):
+        for dim in dims:
+            legacy = timeAgent(agent, LegacyBoard, dim, steps, seed)
+            diamond = timeAgent(agent, StepLimitedBoard, dim, steps, seed)
+            print(f"{agent.__name__:<20}{dim:>6}{legacy:>16.6f}{diamond:>16.6f}{legacy/diamond:>9.1f}x")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    steps = int(args[0]) if len(args) > 0 else 20
+    dims = [int(arg) for arg in args[1:]] if len(args) > 1 else [100, 500, 1000]
+    benchmark(dims, steps)
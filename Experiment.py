@@ -0,0 +1,284 @@
+'''Run many trials of the agents and summarize the results'''
+
+import math
+import time
+from itertools import combinations
+from multiprocessing import Pool
+from statistics import NormalDist
+
+import numpy as np
+
+from Agent import teamAgent, rule1, rule2, basicAgent1, basicAgent2, basicAgent3, improvedAgent, moveRule1, moveRule2, moveAgent1, moveAgent2, moveAgent3, moveImprovedAgent, moveFilterAgent1, moveFilterAgent2, moveFilterAgent3, moveFilterImprovedAgent
+from Board import Board
+from Results import Z_95, RunningStats, CSVWriter, ColumnWriter
+from Scenarios import Corpus, sharedScenario
+from Shared import SharedArrays, attach, boardArrays, sharedBoard
+from Storage import makeRng
+
+STATIONARY = {}
+MOVING = {"moving_target": True}
+FILTER = {"moving_target": True, "belief_filter": True}
+
+#name: (agent function, keyword arguments for the Board, keyword arguments for the agent)
+AGENTS = {
+    "Rule 1": (rule1, STATIONARY, {}),
+    "Rule 2": (rule2, STATIONARY, {}),
+    "Agent 1": (basicAgent1, STATIONARY, {}),
+    "Agent 2": (basicAgent2, STATIONARY, {}),
+    "Agent 3": (basicAgent3, STATIONARY, {}),
+    "Improved Agent": (improvedAgent, STATIONARY, {}),
+    "Moving Rule 1": (rule1, MOVING, {"moving_target": True}),
+    "Modified Rule 1": (moveRule1, MOVING, {}),
+    "Moving Rule 2": (rule2, MOVING, {"moving_target": True}),
+    "Modified Rule 2": (moveRule2, MOVING, {}),
+    "Moving Agent 1": (basicAgent1, MOVING, {"moving_target": True}),
+    "Modified Agent 1": (moveAgent1, MOVING, {}),
+    "Moving Agent 2": (basicAgent2, MOVING, {"moving_target": True}),
+    "Modified Agent 2": (moveAgent2, MOVING, {}),
+    "Moving Agent 3": (basicAgent3, MOVING, {"moving_target": True}),
+    "Modified Agent 3": (moveAgent3, MOVING, {}),
+    "Moving Improved Agent": (improvedAgent, MOVING, {"moving_target": True}),
+    "Modified Improved Agent": (moveImprovedAgent, MOVING, {}),
+    "Filter Agent 1": (moveFilterAgent1, FILTER, {}),
+    "Filter Agent 2": (moveFilterAgent2, FILTER, {}),
+    "Filter Agent 3": (moveFilterAgent3, FILTER, {}),
+    "Filter Improved Agent": (moveFilterImprovedAgent, FILTER, {}),
+}
+
+#Agents run by runner.py, indexed by (moving target, count movement)
+GROUPS = {
+    (0, 0): ["Rule 1", "Rule 2"],
+    (0, 1): ["Agent 1", "Agent 2", "Agent 3", "Improved Agent"],
+    (1, 0): ["Moving Rule 1", "Modified Rule 1", "Moving Rule 2", "Modified Rule 2"],
+    (1, 1): ["Moving Agent 1", "Modified Agent 1", "Moving Agent 2", "Modified Agent 2", "Moving Agent 3", "Modified Agent 3", "Moving Improved Agent", "Modified Improved Agent", "Filter Agent 1", "Filter Agent 2", "Filter Agent 3", "Filter Improved Agent"],
+}
+
+PERCENTILES = (5, 25, 75, 95)
+STREAM_BATCH = 4096 #Trials handed to the pool at a time when streaming, bounds the queued tasks
+
+
+def trialSeed(seed: int, trial: int) -> int:
+    '''Seed for a single trial, depends only on the base seed and the trial number so results do not depend on the worker count'''
+    return int(np.random.SeedSequence([seed, trial]).generate_state(1)[0])
+
+def runTrial(task: tuple) -> tuple:
+    '''Run one trial of an agent, task is (agent name, dim, base seed, trial number). Returns (actions, wall time)'''
+    name, dim, seed, trial = task
+    agent, board_kwargs, kwargs = AGENTS[name]
+    start = time.perf_counter()
+    actions = agent(Board(dim, rng=trialSeed(seed, trial), **board_kwargs), **kwargs)
+    end = time.perf_counter()
+    return int(actions), end-start
+
+def runTrials(name: str, dim: int, trials: int, workers=1, seed=0) -> tuple:
+    '''Run trials of an agent spread over a process pool. Returns arrays (actions, wall times) in trial order'''
+    tasks = [(name, dim, seed, trial) for trial in range(trials)]
+    if workers <= 1:
+        results = [runTrial(task) for task in tasks]
+    else:
+        with Pool(workers) as pool:
+            results = pool.map(runTrial, tasks, chunksize=max(1, trials // (workers*4)))
+    actions = np.array([result[0] for result in results])
+    times = np.array([result[1] for result in results])
+    return actions, times
+
+def iterTrials(name: str, dim: int, trials: int, workers=1, seed=0):
+    '''Yield (trial, actions, wall time) of an agent in trial order, with only STREAM_BATCH trials queued at a time'''
+    if workers <= 1:
+        for trial in range(trials):
+            yield (trial,) + runTrial((name, dim, seed, trial))
+        return
+    with Pool(workers) as pool:
+        for start in range(0, trials, STREAM_BATCH):
+            tasks = [(name, dim, seed, trial) for trial in range(start, min(trials, start+STREAM_BATCH))]
+            for trial, result in enumerate(pool.imap(runTrial, tasks, chunksize=max(1, len(tasks) // (workers*4))), start):
+                yield (trial,) + result
+
+#Columns of a streamed result file, with the dtype of each in the binary format
+STREAM_COLUMNS = {"agent": np.uint8, "trial": np.int64, "actions": np.int64, "seconds": np.float64}
+
+def streamTrials(names: list, dim: int, trials: int, workers=1, seed=0, path=None, report_every=0) -> dict:
+    '''Run trials of each agent, writing every result to path as it arrives and keeping only running statistics
+
+    path ending in .csv is written as CSV, any other path as a directory of binary columns (agent is the index in names).
+    Every report_every trials the running summary of the current agent is printed. Returns {name: (actions stats, time stats)}.
+    '''
+    writer = None
+    if path is not None:
+        writer = CSVWriter(path, list(STREAM_COLUMNS)) if path.endswith(".csv") else ColumnWriter(path, STREAM_COLUMNS, meta={"agent": list(names), "dim": dim, "seed": seed})
+    results = {}
+    try:
+        for code, name in enumerate(names):
+            actions_stats, time_stats = RunningStats(PERCENTILES), RunningStats(PERCENTILES)
+            results[name] = (actions_stats, time_stats)
+            for trial, actions, seconds in iterTrials(name, dim, trials, workers, seed):
+                actions_stats.add(actions)
+                time_stats.add(seconds)
+                if writer is not None:
+                    writer.write((name if path.endswith(".csv") else code, trial, actions, seconds))
+                if report_every and (trial+1) % report_every == 0:
+                    print(formatSummary(f"{name} Actions ({trial+1}/{trials})", actions_stats.summary()), flush=True)
+    finally:
+        if writer is not None:
+            writer.close()
+    return results
+
+def runPairedTrial(task: tuple) -> list:
+    '''Run several agents on the board of one trial, task is (agent names, dim, base seed, trial number). Returns the actions of each'''
+    names, dim, seed, trial = task
+    return [runTrial((name, dim, seed, trial))[0] for name in names]
+
+def sequentialTrials(names: list, dim: int, workers=1, seed=0, precision=None, alpha=0.05, batch=100, min_trials=30, max_trials=10000) -> dict:
+    '''Run paired trials of the agents in batches until the result is clear, instead of a fixed number of trials
+
+    Every trial runs all agents on the same board (terrain, target and random stream), so agents are compared through
+    their per trial differences, which vary much less than the actions themselves. After each batch (once min_trials
+    have run) it stops when
+    - precision is given and every agent's mean is known to within precision (relative to the mean), or
+    - there are several agents and every pairwise difference of means is significant.
+    The stopping rule looks at the data after every batch, so the confidence level is split over the planned looks
+    (Bonferroni) to keep the chance of stopping on a false difference below alpha.
+
+    Returns {"trials", "reason", "z", "agents": {name: RunningStats}, "differences": {(name, name): RunningStats}}.
+    '''
+    looks = math.ceil(max_trials / batch)
+    z = NormalDist().inv_cdf(1 - alpha / (2*looks))
+    agents = {name: RunningStats(PERCENTILES) for name in names}
+    differences = {pair: RunningStats(PERCENTILES) for pair in combinations(names, 2)}
+    pool = Pool(workers) if workers > 1 else None
+    trials, reason = 0, "max_trials"
+    try:
+        while trials < max_trials:
+            tasks = [(names, dim, seed, trial) for trial in range(trials, min(max_trials, trials+batch))]
+            results = pool.imap(runPairedTrial, tasks, chunksize=max(1, len(tasks) // (workers*4))) if pool else map(runPairedTrial, tasks)
+            for actions in results:
+                for name, value in zip(names, actions):
+                    agents[name].add(value)
+                for (first, second), stats in differences.items():
+                    stats.add(actions[names.index(first)] - actions[names.index(second)])
+            trials += len(tasks)
+            if trials < min_trials:
+                continue
+            if precision is not None and all(stats.halfWidth(z) <= precision * abs(stats.mean) for stats in agents.values()):
+                reason = "precision"
+                break
+            if differences and all(abs(stats.mean) > stats.halfWidth(z) for stats in differences.values()):
+                reason = "significance"
+                break
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return {"trials": trials, "reason": reason, "z": z, "agents": agents, "differences": differences}
+
+def runTeamTrial(task: tuple) -> tuple:
+    '''Run a team on the board of one trial, task is (searchers, rule, dim, base seed, trial number). Returns (total actions, wall clock actions, wall time)'''
+    searchers, rule, dim, seed, trial = task
+    start = time.perf_counter()
+    total, wall = teamAgent(Board(dim, rng=trialSeed(seed, trial)), searchers, rule)
+    end = time.perf_counter()
+    return total, wall, end-start
+
+def teamScaling(team_sizes: list, rule: str, dim: int, trials: int, workers=1, seed=0) -> dict:
+    '''Mean total actions, wall clock actions and wall time of teams of each size, every size searching the same boards'''
+    tasks = [(searchers, rule, dim, seed, trial) for searchers in team_sizes for trial in range(trials)]
+    if workers <= 1:
+        results = [runTeamTrial(task) for task in tasks]
+    else:
+        with Pool(workers) as pool:
+            results = pool.map(runTeamTrial, tasks, chunksize=max(1, len(tasks) // (workers*4)))
+    results = np.array(results, dtype=float).reshape(len(team_sizes), trials, 3)
+    return {searchers: dict(zip(("total", "wall", "seconds"), means)) for searchers, means in zip(team_sizes, results.mean(axis=1))}
+
+_corpora = {} #Corpora opened by this process, by path
+
+def openCorpus(path: str) -> Corpus:
+    if path not in _corpora:
+        _corpora[path] = Corpus(path)
+    return _corpora[path]
+
+def runScenario(task: tuple) -> tuple:
+    '''Run an agent on one scenario of a corpus, task is (agent name, corpus path, scenario index). Returns (actions, wall time)'''
+    name, path, index = task
+    agent, board_kwargs, kwargs = AGENTS[name]
+    board = openCorpus(path).board(index, **board_kwargs)
+    start = time.perf_counter()
+    actions = agent(board, **kwargs)
+    end = time.perf_counter()
+    return int(actions), end-start
+
+def runSharedScenario(task: tuple) -> tuple:
+    '''runScenario on a corpus published with Corpus.share, task is (agent name, shared spec, scenario index)'''
+    name, spec, index = task
+    agent, board_kwargs, kwargs = AGENTS[name]
+    board = sharedScenario(spec, index, **board_kwargs)
+    start = time.perf_counter()
+    actions = agent(board, **kwargs)
+    end = time.perf_counter()
+    return int(actions), end-start
+
+def runCorpus(name: str, path: str, workers=1, shared=None) -> tuple:
+    '''Replay an agent on every scenario of a corpus, workers only read the scenarios they run. Returns arrays (actions, wall times) in scenario order
+
+    shared is the spec of the corpus published with Corpus.share, so workers attach to it instead of reading path.
+    '''
+    count = len(openCorpus(path))
+    run = runScenario if shared is None else runSharedScenario
+    tasks = [(name, path if shared is None else shared, index) for index in range(count)]
+    if workers <= 1:
+        results = [run(task) for task in tasks]
+    else:
+        with Pool(workers) as pool:
+            results = pool.map(run, tasks, chunksize=max(1, count // (workers*4)))
+    actions = np.array([result[0] for result in results])
+    times = np.array([result[1] for result in results])
+    return actions, times
+
+def runBoardTrial(task: tuple) -> tuple:
+    '''Run one trial on a shared board, task is (agent name, shared spec, base seed, trial number). Returns (actions, wall time)'''
+    name, spec, seed, trial = task
+    agent, board_kwargs, kwargs = AGENTS[name]
+    rng = makeRng(trialSeed(seed, trial))
+    dim = len(attach(spec)["terrain"])
+    target = (int(rng.integers(dim)), int(rng.integers(dim))) #Drawn like a generated board's, after its terrain
+    board = sharedBoard(spec, target, rng, **board_kwargs)
+    start = time.perf_counter()
+    actions = agent(board, **kwargs)
+    end = time.perf_counter()
+    return int(actions), end-start
+
+def runBoardTrials(name: str, board: Board, trials: int, workers=1, seed=0) -> tuple:
+    '''Run trials of an agent on the terrain and belief of one board, each with its own target and random stream
+
+    The board's arrays are published in shared memory once and every worker attaches to them, so a large board is
+    neither pickled per task nor generated per trial. board must use the storage profile of the agent's board kwargs.
+    Returns arrays (actions, wall times) in trial order.
+    '''
+    with SharedArrays(boardArrays(board)) as shared:
+        tasks = [(name, shared.spec, seed, trial) for trial in range(trials)]
+        if workers <= 1:
+            results = [runBoardTrial(task) for task in tasks]
+        else:
+            with Pool(workers) as pool:
+                results = pool.map(runBoardTrial, tasks, chunksize=max(1, trials // (workers*4)))
+    actions = np.array([result[0] for result in results])
+    times = np.array([result[1] for result in results])
+    return actions, times
+
+def summarize(values: np.ndarray) -> dict:
+    '''Mean, median, standard deviation, percentiles and 95% confidence interval of the mean'''
+    values = np.asarray(values, dtype=float)
+    mean = values.mean()
+    std = values.std(ddof=1) if len(values) > 1 else 0.0
+    half_width = Z_95 * std / np.sqrt(len(values))
+    stats = {"trials": len(values), "mean": mean, "median": float(np.median(values)), "std": std}
+    for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        stats[f"p{p}"] = float(value)
+    stats["ci_low"] = mean - half_width
+    stats["ci_high"] = mean + half_width
+    return stats
+
+def formatSummary(label: str, stats: dict) -> str:
+    percentiles = ", ".join(f"p{p}={stats[f'p{p}']:.4g}" for p in PERCENTILES)
+    return (f"{label}: mean={stats['mean']:.4g} (95% CI {stats['ci_low']:.4g} - {stats['ci_high']:.4g}), "
+            f"median={stats['median']:.4g}, std={stats['std']:.4g}, {percentiles}")
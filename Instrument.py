@@ -0,0 +1,117 @@
+'''Optional per step instrumentation for the agents
+
+Agents call probe.mark(phase) right after each phase of a step, so the time since the previous mark is charged to that
+phase, probe.step(board) after every exploration and probe.walk(distance) after every move. The default NULL_PROBE
+does nothing in any of them.
+'''
+
+import csv
+import json
+import time
+
+import numpy as np
+
+#Phases marked by the agents in Agent.py
+PHASES = ("select", "explore", "target_movement", "update_cleared_cells", "update", "isNearby")
+
+
+class NullProbe:
+    '''Instrumentation that records nothing, the default for every agent'''
+
+    def begin(self, board) -> None:
+        pass
+
+    def mark(self, phase: str) -> None:
+        pass
+
+    def step(self, board) -> None:
+        pass
+
+    def walk(self, distance) -> None:
+        pass
+
+    def end(self, actions) -> None:
+        pass
+
+NULL_PROBE = NullProbe()
+
+
+def beliefStats(board) -> tuple:
+    '''(max probability, entropy in nats) of the normalized belief'''
+    belief = np.asarray(board.board, dtype=float)
+    belief = belief / belief.sum()
+    nonzero = belief[belief > 0]
+    return float(belief.max()), float(-(nonzero * np.log(nonzero)).sum())
+
+
+class Probe(NullProbe):
+    '''Collects per phase cumulative time and call counts, steps, walking distance and belief statistics
+
+    Belief statistics are O(dim^2), so they are sampled every belief_every steps (0 turns them off) and the time spent on
+    them is not charged to any phase.
+    '''
+
+    def __init__(self, belief_every=1):
+        self.belief_every = belief_every
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.calls = dict.fromkeys(PHASES, 0)
+        self.steps = 0
+        self.walked = 0
+        self.actions = None
+        self.total_time = 0.0
+        self.belief_history = [] #(step, max probability, entropy)
+        self._start = self._last = time.perf_counter()
+
+    def begin(self, board) -> None:
+        self._sampleBelief(board)
+        self._start = self._last = time.perf_counter()
+
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.times[phase] = self.times.get(phase, 0.0) + now - self._last
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+        self._last = now
+
+    def step(self, board) -> None:
+        self.steps += 1
+        if self.belief_every and self.steps % self.belief_every == 0:
+            paused = time.perf_counter()
+            self._sampleBelief(board)
+            self._last += time.perf_counter() - paused #Don't charge the statistics to the next phase
+
+    def walk(self, distance) -> None:
+        self.walked += int(distance)
+
+    def end(self, actions) -> None:
+        self.actions = int(actions)
+        self.total_time = time.perf_counter() - self._start
+
+    def _sampleBelief(self, board) -> None:
+        if self.belief_every:
+            self.belief_history.append((self.steps,) + beliefStats(board))
+
+    def toDict(self) -> dict:
+        return {
+            "actions": self.actions,
+            "steps": self.steps,
+            "walked": self.walked,
+            "total_time": self.total_time,
+            "phases": {phase: {"time": self.times[phase], "calls": self.calls[phase]} for phase in self.times},
+            "belief": [{"step": step, "max_probability": max_prob, "entropy": entropy} for step, max_prob, entropy in self.belief_history],
+        }
+
+    def toJSON(self, path: str) -> None:
+        with open(path, "w") as output:
+            json.dump(self.toDict(), output, indent=1)
+
+    def toCSV(self, path: str) -> None:
+        '''Run totals, then one row per phase (value is its time), then one row per belief sample'''
+        with open(path, "w", newline="") as output:
+            writer = csv.writer(output)
+            writer.writerow(["kind", "name", "value", "calls", "step", "max_probability", "entropy"])
+            for name in ("actions", "steps", "walked", "total_time"):
+                writer.writerow(["run", name, getattr(self, name), "", "", "", ""])
+            for phase in self.times:
+                writer.writerow(["phase", phase, self.times[phase], self.calls[phase], "", "", ""])
+            for step, max_prob, entropy in self.belief_history:
+                writer.writerow(["belief", "", "", "", step, max_prob, entropy])
@@ -0,0 +1,68 @@
+'''Tournament tree for maintaining the argmax of an array under point updates'''
+
+import numpy as np
+
+
+class MaxTree:
+    '''Tournament tree over a flat array
+
+    Every internal node keeps the maximum of its children and the flat index it came from. Ties go to the left child, so
+    argmax() returns the same index as np.argmax on the underlying array.
+    '''
+
+    def __init__(self, values: np.ndarray):
+        values = np.ravel(values)
+        self.n = len(values)
+        self._size = 1
+        while self._size < self.n:
+            self._size *= 2
+        self._max = np.full(2*self._size, -np.inf) #Padding leaves can never win
+        self._index = np.zeros(2*self._size, dtype=np.int64)
+        self._max[self._size:self._size+self.n] = values
+        self._index[self._size:] = np.arange(self._size)
+        level = self._size // 2
+        while level >= 1: #Build one level at a time from the leaves up
+            nodes = np.arange(level, 2*level)
+            self._pull(nodes)
+            level //= 2
+
+    def _pull(self, nodes: np.ndarray) -> None:
+        '''Recompute the given internal nodes from their children'''
+        left = 2*nodes
+        right = left + 1
+        winner = np.where(self._max[left] >= self._max[right], left, right)
+        self._max[nodes] = self._max[winner]
+        self._index[nodes] = self._index[winner]
+
+    def update(self, pos: int, value: float) -> None:
+        '''Set a single element, O(log n)'''
+        node = pos + self._size
+        self._max[node] = value
+        node //= 2
+        while node >= 1:
+            left = 2*node
+            winner = left if self._max[left] >= self._max[left+1] else left+1
+            self._max[node] = self._max[winner]
+            self._index[node] = self._index[winner]
+            node //= 2
+        return
+
+    def updateMany(self, positions: np.ndarray, values: np.ndarray) -> None:
+        '''Set many elements at once, O(k log n) with one vectorized pass per tree level'''
+        if len(positions) == 0:
+            return
+        nodes = np.asarray(positions) + self._size
+        self._max[nodes] = values
+        nodes = np.unique(nodes // 2)
+        while nodes[0] >= 1:
+            self._pull(nodes)
+            if nodes[0] == 1:
+                break
+            nodes = np.unique(nodes // 2)
+        return
+
+    def argmax(self) -> int:
+        return int(self._index[1])
+
+    def max(self) -> float:
+        return float(self._max[1])
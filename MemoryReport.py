@@ -0,0 +1,53 @@
+'''Report the peak memory of a moving target board for each storage profile
+
+Valid Arguments:
+    python3 MemoryReport.py [<Board Dimension> ...]
+    - Board Dimension: default 100 500 1000 2000
+
+Peaks are measured with tracemalloc (NumPy reports its array allocations to it), once while building the board and
+once over a call of each selection and update method, so they include the largest temporaries.
+'''
+import sys
+import tracemalloc
+
+from Board import Board
+from Storage import PROFILES, cellBytes
+
+
+def stepAll(board: Board) -> None:
+    '''One call of every method a moving target agent uses per step'''
+    pos = (board.dim//2, board.dim//2)
+    board.exploreMove(pos)
+    board.target_movement()
+    board.update_probability(pos)
+    board.isNearby(pos)
+    board.bestContains()
+    board.bestFind()
+    board.bestContainsMoving()
+    board.bestFindMoving()
+    board.bestDistNumpy(pos)
+    board.bestDistMoving(pos)
+    return
+
+def peakBytes(dim: int, profile: str) -> tuple:
+    '''returns (bytes held by the board, peak bytes while building it, peak bytes while stepping)'''
+    tracemalloc.start()
+    board = Board(dim, moving_target=True, storage=profile)
+    held, build_peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    stepAll(board)
+    _, step_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return held, build_peak, step_peak
+
+def report(dims: list) -> None:
+    print(f"{'Profile':<10}{'Dim':>7}{'Stored B/cell':>15}{'Held MB':>10}{'Build peak MB':>15}{'Step peak MB':>14}{'Step peak B/cell':>18}")
+    for profile in PROFILES:
+        for dim in dims:
+            held, build_peak, step_peak = peakBytes(dim, profile)
+            print(f"{profile:<10}{dim:>7}{cellBytes(profile):>15}{held/2**20:>10.1f}{build_peak/2**20:>15.1f}{step_peak/2**20:>14.1f}{step_peak/dim**2:>18.1f}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    report([int(arg) for arg in args] if len(args) > 0 else [100, 500, 1000, 2000])
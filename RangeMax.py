@@ -0,0 +1,191 @@
+'''Maximum of a board score over manhattan diamonds, kept as a pyramid of block maxima in rotated coordinates
+
+With u = row + col and v = row - col + dim - 1, the cells within manhattan distance x of a cell are exactly the cells in
+an axis aligned box of half width x around it in (u, v). Only every other (u, v) is a cell, so the rotated grid is twice
+as wide as the board, and the rest of it holds -inf.
+'''
+
+import numpy as np
+
+LEAF = 16 #Side of the smallest stored blocks in rotated coordinates, each covers about LEAF**2/2 cells
+WINDOW_CELLS = 1 << 16 #Smaller windows are faster to scan directly than to descend the pyramid for
+REBUILD_SHARE = 8 #Updates of more than 1/REBUILD_SHARE of the cells rebuild the pyramid instead
+_CHILD_U = np.array([0, 0, 1, 1])
+_CHILD_V = np.array([0, 1, 0, 1])
+
+
+class DiamondMax:
+    '''Pyramid of the maximum of score(rows, cols) over LEAF * 2**level sided blocks of the rotated grid
+
+    Every block also keeps the lowest flat index holding its maximum, so queries break ties in row-major order like
+    Diamond.bestInWindow. score is called with arrays of rows and cols and must return their scores.
+    '''
+
+    def __init__(self, dim: int, score):
+        self.dim = dim
+        self._score = score
+        self.size = 2*dim - 1 #Side of the rotated grid
+        self.blocks = -(-self.size // LEAF) #Leaf blocks per side
+        self.levels = 1
+        while (self.blocks + (1 << (self.levels-1)) - 1) >> (self.levels-1) > 1:
+            self.levels += 1
+        #(u, v) offsets within a leaf block that hold cells, LEAF is even so this is the same for every block
+        offset_u, offset_v = np.divmod(np.arange(LEAF*LEAF), LEAF)
+        on_cells = (offset_u + offset_v + self.dim - 1) % 2 == 0
+        self._offset_u, self._offset_v = offset_u[on_cells], offset_v[on_cells]
+        self.build()
+
+    def build(self) -> None:
+        '''Rescan every cell, after the whole score changed'''
+        rows, cols = np.divmod(np.arange(self.dim*self.dim), self.dim)
+        values = np.asarray(self._score(rows, cols))
+        block = ((rows + cols) // LEAF) * self.blocks + (rows - cols + self.dim - 1) // LEAF
+        leaf_max = np.full(self.blocks*self.blocks, -np.inf, dtype=values.dtype)
+        np.maximum.at(leaf_max, block, values)
+        at_max = np.flatnonzero(values == leaf_max[block]) #Cells holding the maximum of their block
+        leaf_arg = np.full(self.blocks*self.blocks, self.dim*self.dim, dtype=np.int64)
+        np.minimum.at(leaf_arg, block[at_max], at_max)
+        self._max = [leaf_max.reshape(self.blocks, self.blocks)]
+        self._arg = [leaf_arg.reshape(self.blocks, self.blocks)]
+        for level in range(1, self.levels):
+            side = -(-self._max[level-1].shape[0] // 2)
+            self._max.append(np.full((side, side), -np.inf, dtype=values.dtype))
+            self._arg.append(np.full((side, side), self.dim*self.dim, dtype=np.int64))
+            self._pull(level, *np.divmod(np.arange(side*side), side))
+        return
+
+    def _pull(self, level: int, us: np.ndarray, vs: np.ndarray) -> None:
+        '''Recompute blocks (us, vs) of a level from their four children'''
+        below_max, below_arg = self._max[level-1], self._arg[level-1]
+        side = below_max.shape[0]
+        best = np.full(len(us), -np.inf, dtype=below_max.dtype)
+        arg = np.full(len(us), self.dim*self.dim, dtype=np.int64)
+        for du in (0, 1):
+            for dv in (0, 1):
+                child_u, child_v = 2*us + du, 2*vs + dv
+                valid = (child_u < side) & (child_v < side)
+                value = np.where(valid, below_max[np.minimum(child_u, side-1), np.minimum(child_v, side-1)], -np.inf)
+                index = np.where(valid, below_arg[np.minimum(child_u, side-1), np.minimum(child_v, side-1)], self.dim*self.dim)
+                better = (value > best) | ((value == best) & (index < arg))
+                best = np.where(better, value, best)
+                arg = np.where(better, index, arg)
+        self._max[level][us, vs] = best
+        self._arg[level][us, vs] = arg
+        return
+
+    def _leafCells(self, block_u: np.ndarray, block_v: np.ndarray) -> tuple:
+        '''(block number, rows, cols) of every board cell in the given leaf blocks'''
+        u = block_u[:, None] * LEAF + self._offset_u
+        twice_row = u + block_v[:, None] * LEAF + self._offset_v - (self.dim - 1)
+        rows = twice_row // 2
+        cols = u - rows
+        valid = (rows >= 0) & (rows < self.dim) & (cols >= 0) & (cols < self.dim)
+        return np.nonzero(valid)[0], rows[valid], cols[valid]
+
+    def update(self, flat: np.ndarray) -> None:
+        '''Refresh the pyramid after the scores of the given flat cells changed'''
+        if len(flat) > self.dim*self.dim // REBUILD_SHARE:
+            self.build()
+            return
+        rows, cols = np.divmod(np.asarray(flat), self.dim)
+        blocks = ((rows + cols) // LEAF) * self.blocks + (rows - cols + self.dim - 1) // LEAF
+        if len(blocks) > 1:
+            blocks = np.unique(blocks)
+        block_u, block_v = np.divmod(blocks, self.blocks)
+        owner, cell_rows, cell_cols = self._leafCells(block_u, block_v)
+        values = np.asarray(self._score(cell_rows, cell_cols))
+        cells = cell_rows * self.dim + cell_cols
+        if len(blocks) == 1: #A single chain of blocks, cheaper to climb one scalar at a time
+            top = values.max()
+            top_arg = cells[values == top].min()
+            u, v = int(block_u[0]), int(block_v[0])
+            if self._max[0][u, v] != top or self._arg[0][u, v] != top_arg: #Otherwise no ancestor changes either
+                self._max[0][u, v] = top
+                self._arg[0][u, v] = top_arg
+                self._climb(u, v)
+            return
+        order = np.lexsort((cells, -values, owner))
+        first = np.r_[True, owner[order][1:] != owner[order][:-1]]
+        self._max[0][block_u[owner[order[first]]], block_v[owner[order[first]]]] = values[order[first]]
+        self._arg[0][block_u[owner[order[first]]], block_v[owner[order[first]]]] = cells[order[first]]
+        for level in range(1, self.levels):
+            blocks = np.unique((block_u // 2) * self.blocks + block_v // 2)
+            block_u, block_v = np.divmod(blocks, self.blocks)
+            self._pull(level, block_u, block_v)
+        return
+
+    def _climb(self, u: int, v: int) -> None:
+        '''_pull the ancestors of leaf block (u, v), level by level until one stays the same'''
+        for level in range(1, self.levels):
+            below_max, below_arg = self._max[level-1], self._arg[level-1]
+            side = below_max.shape[0]
+            u, v = u // 2, v // 2
+            best, arg = -np.inf, self.dim*self.dim
+            for child_u in (2*u, 2*u + 1):
+                for child_v in (2*v, 2*v + 1):
+                    if child_u < side and child_v < side:
+                        value, index = below_max[child_u, child_v], below_arg[child_u, child_v]
+                        if value > best or (value == best and index < arg):
+                            best, arg = value, index
+            if self._max[level][u, v] == best and self._arg[level][u, v] == arg:
+                break
+            self._max[level][u, v] = best
+            self._arg[level][u, v] = arg
+        return
+
+    def worthIt(self, pos: tuple, radius: int) -> bool:
+        '''Whether the board window of the diamond is big enough for query to beat scanning it'''
+        row, col = pos
+        height = min(self.dim, row + radius + 1) - max(0, row - radius)
+        width = min(self.dim, col + radius + 1) - max(0, col - radius)
+        return height * width > WINDOW_CELLS
+
+    def query(self, pos: tuple, radius: int) -> tuple:
+        '''Cell with the highest score within manhattan distance radius of pos, the first in row-major order on ties'''
+        row, col = pos
+        u, v = row + col, row - col + self.dim - 1
+        low_u, high_u = max(0, u - radius), min(self.size - 1, u + radius)
+        low_v, high_v = max(0, v - radius), min(self.size - 1, v + radius)
+        #Start where a block is at least as wide as the box, so at most 2x2 blocks overlap it
+        level = 0
+        while level < self.levels - 1 and LEAF << level < 2*radius + 1:
+            level += 1
+        side = LEAF << level
+        us, vs = np.meshgrid(np.arange(low_u // side, high_u // side + 1), np.arange(low_v // side, high_v // side + 1), indexing='ij')
+        us, vs = us.ravel(), vs.ravel()
+        best, best_arg = -np.inf, self.dim*self.dim
+        while True:
+            side = LEAF << level
+            flat = us * self._max[level].shape[1] + vs
+            values, args = self._max[level].take(flat), self._arg[level].take(flat)
+            #Blocks entirely in the box count as they are
+            inside = (us >= -(-low_u // side)) & (us < (high_u + 1) // side) & (vs >= -(-low_v // side)) & (vs < (high_v + 1) // side)
+            if inside.any():
+                top = values[inside].max()
+                top_arg = args[inside & (values == top)].min()
+                if top > best or (top == best and top_arg < best_arg):
+                    best, best_arg = top, top_arg
+            #Blocks the box cuts are split, unless even their maximum can't win
+            keep = ~inside & ((values > best) | ((values == best) & (args < best_arg)))
+            us, vs = us[keep], vs[keep]
+            if len(us) == 0:
+                break
+            if level == 0:
+                _, rows, cols = self._leafCells(us, vs)
+                cell_u, cell_v = rows + cols, rows - cols + self.dim - 1
+                box = (cell_u >= low_u) & (cell_u <= high_u) & (cell_v >= low_v) & (cell_v <= high_v)
+                rows, cols = rows[box], cols[box]
+                if len(rows):
+                    scores = np.asarray(self._score(rows, cols))
+                    top = scores.max()
+                    top_arg = (rows * self.dim + cols)[scores == top].min()
+                    if top > best or (top == best and top_arg < best_arg):
+                        best, best_arg = top, top_arg
+                break
+            level -= 1
+            side = LEAF << level
+            us = (2*us[:, None] + _CHILD_U).ravel()
+            vs = (2*vs[:, None] + _CHILD_V).ravel()
+            overlap = (us >= low_u // side) & (us <= high_u // side) & (vs >= low_v // side) & (vs <= high_v // side)
+            us, vs = us[overlap], vs[overlap]
+        return int(best_arg) // self.dim, int(best_arg) % self.dim
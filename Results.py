@@ -0,0 +1,186 @@
+'''Constant memory aggregates and buffered writers for streams of trial results'''
+
+import csv
+import json
+import math
+import os
+
+import numpy as np
+
+Z_95 = 1.959963984540054 #Two sided 95% normal quantile
+FLUSH_ROWS = 4096 #Rows buffered by a writer before they are written out
+
+
+class P2Quantile:
+    '''Streaming estimate of one quantile with the P^2 algorithm (Jain and Chlamtac), five markers whatever the stream length'''
+
+    def __init__(self, p: float):
+        self.p = p
+        self._heights = []
+        self._positions = [0, 1, 2, 3, 4]
+        self._desired = [0, 2*p, 4*p, 2 + 2*p, 4]
+        self._increments = [0, p/2, p, (1 + p)/2, 1]
+
+    def add(self, x: float) -> None:
+        heights = self._heights
+        if len(heights) < 5: #Exact until the markers are placed
+            heights.append(x)
+            heights.sort()
+            return
+        positions = self._positions
+        if x < heights[0]:
+            heights[0] = x
+            cell = 0
+        elif x >= heights[4]:
+            heights[4] = x
+            cell = 3
+        else:
+            cell = 0
+            while x >= heights[cell+1]:
+                cell += 1
+        for marker in range(cell+1, 5):
+            positions[marker] += 1
+        for marker in range(5):
+            self._desired[marker] += self._increments[marker]
+        for marker in (1, 2, 3): #Move the middle markers towards their desired positions
+            offset = self._desired[marker] - positions[marker]
+            if (offset >= 1 and positions[marker+1] - positions[marker] > 1) or (offset <= -1 and positions[marker-1] - positions[marker] < -1):
+                step = 1 if offset > 0 else -1
+                height = self._parabolic(marker, step)
+                if not heights[marker-1] < height < heights[marker+1]:
+                    height = heights[marker] + step * (heights[marker+step] - heights[marker]) / (positions[marker+step] - positions[marker])
+                heights[marker] = height
+                positions[marker] += step
+        return
+
+    def _parabolic(self, marker: int, step: int) -> float:
+        heights, positions = self._heights, self._positions
+        below = positions[marker] - positions[marker-1]
+        above = positions[marker+1] - positions[marker]
+        return heights[marker] + step / (positions[marker+1] - positions[marker-1]) * (
+            (below + step) * (heights[marker+1] - heights[marker]) / above + (above - step) * (heights[marker] - heights[marker-1]) / below)
+
+    def value(self) -> float:
+        if not self._heights:
+            return math.nan
+        if len(self._heights) < 5:
+            return float(np.percentile(self._heights, self.p * 100))
+        return float(self._heights[2])
+
+
+class RunningStats:
+    '''Count, mean and variance (Welford), extremes and P^2 percentile estimates of a stream, in O(1) memory'''
+
+    def __init__(self, percentiles=(5, 25, 75, 95)):
+        self.percentiles = percentiles
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._median = P2Quantile(0.5)
+        self._quantiles = [P2Quantile(p / 100) for p in percentiles]
+
+    def add(self, x: float) -> None:
+        x = float(x)
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        self._median.add(x)
+        for quantile in self._quantiles:
+            quantile.add(x)
+        return
+
+    def std(self) -> float:
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def halfWidth(self, z=Z_95) -> float:
+        '''Half width of the normal confidence interval of the mean with quantile z'''
+        return z * self.std() / math.sqrt(self.count) if self.count else math.nan
+
+    def summary(self) -> dict:
+        '''Same keys as Experiment.summarize, with the median and percentiles estimated'''
+        half_width = self.halfWidth()
+        stats = {"trials": self.count, "mean": self.mean, "median": self._median.value(), "std": self.std()}
+        for p, quantile in zip(self.percentiles, self._quantiles):
+            stats[f"p{p}"] = quantile.value()
+        stats["ci_low"] = self.mean - half_width
+        stats["ci_high"] = self.mean + half_width
+        return stats
+
+
+class CSVWriter:
+    '''Appends rows to a CSV file, buffered and written out every flush_rows rows'''
+
+    def __init__(self, path: str, columns: list, flush_rows=FLUSH_ROWS):
+        self.columns = list(columns)
+        self.flush_rows = flush_rows
+        self._rows = []
+        self._file = open(path, "w", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.columns)
+
+    def write(self, row: tuple) -> None:
+        self._rows.append(row)
+        if len(self._rows) >= self.flush_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        self._writer.writerows(self._rows)
+        self._rows = []
+        self._file.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self._file.close()
+
+
+class ColumnWriter:
+    '''Appends rows to a directory with one raw binary file per column and a schema.json describing them
+
+    Every column has a fixed numpy dtype, so readColumns can memory map a column without reading the others. meta is
+    any JSON data stored with the schema, such as the names behind a coded column.
+    '''
+
+    def __init__(self, path: str, columns: dict, flush_rows=FLUSH_ROWS, meta=None):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.columns = {name: np.dtype(dtype) for name, dtype in columns.items()}
+        self.flush_rows = flush_rows
+        self._buffers = {name: np.empty(flush_rows, dtype=dtype) for name, dtype in self.columns.items()}
+        self._filled = 0
+        self._files = {name: open(os.path.join(path, name + ".bin"), "wb") for name in self.columns}
+        with open(os.path.join(path, "schema.json"), "w") as schema:
+            json.dump({"columns": {name: dtype.str for name, dtype in self.columns.items()}, "meta": meta}, schema)
+
+    def write(self, row: tuple) -> None:
+        for buffer, value in zip(self._buffers.values(), row):
+            buffer[self._filled] = value
+        self._filled += 1
+        if self._filled == self.flush_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        for name, buffer in self._buffers.items():
+            self._files[name].write(buffer[:self._filled].tobytes())
+            self._files[name].flush()
+        self._filled = 0
+
+    def close(self) -> None:
+        self.flush()
+        for output in self._files.values():
+            output.close()
+
+
+def readColumns(path: str) -> tuple:
+    '''({name: memory mapped column}, meta) of a directory written by a ColumnWriter'''
+    with open(os.path.join(path, "schema.json")) as schema_file:
+        schema = json.load(schema_file)
+    result = {}
+    for name, dtype in schema["columns"].items():
+        column_path = os.path.join(path, name + ".bin")
+        result[name] = np.memmap(column_path, dtype=dtype, mode="r") if os.path.getsize(column_path) else np.empty(0, dtype=dtype)
+    return result, schema["meta"]
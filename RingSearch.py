@@ -0,0 +1,44 @@
+'''Bounded outward search for the (distance weight)/(probability) heuristics'''
+
+import numpy as np
+
+
+def distanceWeight(distance: np.ndarray) -> np.ndarray:
+    '''Weight used by bestDistNumpy and bestDistMoving'''
+    return distance + 1
+
+def weightedDistance(distance: np.ndarray, scale=1.0, offset=5.0) -> np.ndarray:
+    '''Weight used by bestWeightedDist and bestWeightedDist2 (scale 0.5), nondecreasing for a scale of at least 0'''
+    return np.maximum(1.0, (distance + 1) * scale - offset)
+
+
+def ringSearch(board: np.ndarray, mask: np.ndarray, pos: tuple, weight, max_prob: float, cleared=None, block=1, radius=4, clock=0) -> tuple:
+    '''Returns the cell minimizing weight(manhattan distance)/(board*mask), same cell as the full board argmin
+
+    The search covers growing diamonds around pos, doubling the radius each round. weight must be nondecreasing in the
+    distance, so every cell outside a diamond of radius r scores at least weight(r+1)/max_prob, and the search stops
+    once that bound can no longer beat the best score found. Cells where cleared is above clock have their weight
+    multiplied by block. max_prob must be an upper bound of board*mask over the whole board.
+    '''
+    dim = board.shape[0]
+    row, col = pos
+    max_radius = 2*(dim-1)
+    while True:
+        radius = min(radius, max_radius)
+        row_start, row_end = max(0, row-radius), min(dim, row+radius+1)
+        col_start, col_end = max(0, col-radius), min(dim, col+radius+1)
+        distance = np.abs(np.arange(row_start, row_end) - row)[:, None] + np.abs(np.arange(col_start, col_end) - col)[None, :]
+        distance_mask = np.asarray(weight(distance), dtype=board.dtype) #Score in the belief dtype like the full board methods
+        if cleared is not None:
+            distance_mask[cleared[row_start:row_end, col_start:col_end] > clock] *= block #Prevent those which have been cleared from being chosen
+        with np.errstate(divide='ignore', over='ignore'): #Zero or underflowed beliefs score inf
+            scores = np.divide(distance_mask, board[row_start:row_end, col_start:col_end]*mask[row_start:row_end, col_start:col_end])
+        scores[distance > radius] = np.inf #Window corners lie outside the diamond
+        min_pos = scores.argmin() #Window is row-major like the board, so ties resolve the same way
+        best = scores.flat[min_pos]
+        #Anything further away scores at least weight(radius+1)/max_prob (in the score dtype, as rounding is monotonic),
+        #ties must keep searching for a smaller index
+        if radius >= max_radius or (max_prob > 0 and scores.dtype.type(weight(radius+1))/scores.dtype.type(max_prob) > best):
+            width = col_end - col_start
+            return row_start + min_pos // width, col_start + min_pos % width
+        radius *= 2
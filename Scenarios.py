@@ -0,0 +1,147 @@
+'''Scenario corpora: many boards saved once so every agent can be replayed on the same terrain, target and random stream
+
+A corpus is either a directory of .npy files, which are memory mapped so only the scenarios read are paged in, or a
+single compressed .npz with one member per scenario array, which are decompressed one at a time on access. Corpus.share
+copies a whole corpus into shared memory once, for pool workers to attach to (see Shared.py).
+
+    terrain   (count, dim, dim) uint8 terrain codes
+    targets   (count, 2) starting position of the target
+    seeds     (count,) seed of each board's generator, which drives the searches and the target walk
+    masks     (count, dim, dim) float64 find masks, only if saved with masks=True
+'''
+
+import os
+import zipfile
+
+import numpy as np
+
+from Board import Board
+from Shared import SharedArrays, attach
+from Storage import FIND_RATES, generateTerrain, makeRng
+
+
+def scenarioRng(seed: int, index: int) -> np.random.Generator:
+    '''Generator for scenario index of a corpus, independent of how many scenarios are generated'''
+    return np.random.default_rng(np.random.SeedSequence([seed, index]))
+
+def makeScenario(dim: int, seed: int, index: int) -> tuple:
+    '''(terrain, target, board seed) of scenario index'''
+    rng = scenarioRng(seed, index)
+    terrain = generateTerrain(dim, np.uint8, rng=rng)
+    target = rng.integers(dim, size=2)
+    return terrain, target, int(rng.integers(2**63))
+
+
+def _writeMember(archive: zipfile.ZipFile, name: str, array: np.ndarray) -> None:
+    with archive.open(name + ".npy", "w", force_zip64=True) as member:
+        np.lib.format.write_array(member, np.asanyarray(array))
+
+def generateCorpus(path: str, count: int, dim: int, seed=0, masks=False) -> None:
+    '''Generate count scenarios into path one at a time, so the corpus never has to fit in memory'''
+    targets = np.empty((count, 2), dtype=np.int64)
+    seeds = np.empty(count, dtype=np.uint64)
+    find_rates = np.array(FIND_RATES)
+    if path.endswith(".npz"):
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for index in range(count):
+                terrain, targets[index], seeds[index] = makeScenario(dim, seed, index)
+                _writeMember(archive, f"terrain_{index}", terrain)
+                if masks:
+                    _writeMember(archive, f"mask_{index}", np.take(find_rates, terrain))
+            _writeMember(archive, "targets", targets)
+            _writeMember(archive, "seeds", seeds)
+        return
+    os.makedirs(path, exist_ok=True)
+    terrains = np.lib.format.open_memmap(os.path.join(path, "terrain.npy"), mode="w+", dtype=np.uint8, shape=(count, dim, dim))
+    if masks:
+        mask_map = np.lib.format.open_memmap(os.path.join(path, "masks.npy"), mode="w+", dtype=np.float64, shape=(count, dim, dim))
+    for index in range(count):
+        terrains[index], targets[index], seeds[index] = makeScenario(dim, seed, index)
+        if masks:
+            np.take(find_rates, terrains[index], out=mask_map[index])
+    terrains.flush()
+    if masks:
+        mask_map.flush()
+    np.save(os.path.join(path, "targets.npy"), targets)
+    np.save(os.path.join(path, "seeds.npy"), seeds)
+    return
+
+
+class Corpus:
+    '''Lazy reader of a saved corpus, scenario arrays are only read when a board is built from them'''
+
+    def __init__(self, path: str):
+        self.path = path
+        self._npz = path.endswith(".npz")
+        if self._npz:
+            self._archive = np.load(path)
+            self.targets = self._archive["targets"]
+            self.seeds = self._archive["seeds"]
+            self._terrain = None
+            self._masks = None
+            self.has_masks = "mask_0" in self._archive.files
+        else:
+            self._terrain = np.load(os.path.join(path, "terrain.npy"), mmap_mode="r")
+            self.targets = np.load(os.path.join(path, "targets.npy"))
+            self.seeds = np.load(os.path.join(path, "seeds.npy"))
+            masks_path = os.path.join(path, "masks.npy")
+            self.has_masks = os.path.exists(masks_path)
+            self._masks = np.load(masks_path, mmap_mode="r") if self.has_masks else None
+
+    def __len__(self) -> int:
+        return len(self.seeds)
+
+    def terrain(self, index: int) -> np.ndarray:
+        if self._npz:
+            return self._archive[f"terrain_{index}"]
+        return self._terrain[index]
+
+    def mask(self, index: int):
+        '''Saved find mask of a scenario, None if the corpus has none'''
+        if not self.has_masks:
+            return None
+        if self._npz:
+            return self._archive[f"mask_{index}"]
+        return self._masks[index]
+
+    def board(self, index: int, **board_kwargs) -> Board:
+        '''Fresh Board for scenario index, board_kwargs are the same as for Board apart from the scenario itself'''
+        return scenarioBoard(self.terrain(index), self.targets[index], self.seeds[index], self.mask(index), **board_kwargs)
+
+    def share(self) -> SharedArrays:
+        '''Copy of every scenario in one shared memory segment, read back with sharedScenario
+
+        The segment is allocated first and filled one scenario at a time, so besides it only a single scenario is ever
+        in memory. A .npz corpus is decompressed once for all workers and agents. A directory corpus is copied from its
+        memory maps as well, though workers reading the maps directly already share the pages of the files.
+        '''
+        terrain = self.terrain(0)
+        empty = {"terrain": ((len(self),) + terrain.shape, terrain.dtype)}
+        if self.has_masks:
+            mask = self.mask(0)
+            empty["masks"] = ((len(self),) + mask.shape, mask.dtype)
+        shared = SharedArrays({"targets": self.targets, "seeds": self.seeds}, empty)
+        views = shared.views()
+        for index in range(len(self)):
+            views["terrain"][index] = self.terrain(index)
+            if self.has_masks:
+                views["masks"][index] = self.mask(index)
+        return shared
+
+    def close(self) -> None:
+        if self._npz:
+            self._archive.close()
+        return
+
+
+def scenarioBoard(terrain: np.ndarray, target, seed, mask=None, **board_kwargs) -> Board:
+    '''Fresh Board for a scenario, the saved mask is only used when board_kwargs keep the default find rates'''
+    target = (int(target[0]), int(target[1]))
+    mask = mask if board_kwargs.get("false_negative_rates") is None else None
+    return Board(len(terrain), copy_board=terrain, copy_target=target, rng=makeRng(int(seed)), board_mask=mask, **board_kwargs)
+
+def sharedScenario(spec: tuple, index: int, **board_kwargs) -> Board:
+    '''Corpus.board of a corpus published with Corpus.share, on read-only views of the shared terrain and mask'''
+    arrays = attach(spec)
+    mask = arrays["masks"][index] if "masks" in arrays else None
+    return scenarioBoard(arrays["terrain"][index], arrays["targets"][index], arrays["seeds"][index], mask, **board_kwargs)
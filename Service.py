@@ -0,0 +1,260 @@
+'''Long lived local simulation service with a warm worker pool
+
+Valid Arguments:
+    python3 Service.py serve <Address> [<Workers>]
+    python3 Service.py submit <Address> <Job JSON>
+    - Address: a Unix socket path, or host:port / port for localhost TCP
+    - Workers: processes in the pool, default 1
+
+Clients send one JSON job per line and get one JSON line back per finished trial, in trial order, then a summary line:
+    {"agent": "basicAgent3", "dim": 20, "moving_target": false, "seed": 0, "trials": 100}
+    - agent: a function of Agent.py, or a name of Experiment.AGENTS such as "Modified Agent 3"
+    - seeds: board seeds to run instead of seed and trials, trial t of seed s uses Experiment.trialSeed(s, t)
+    -> {"job": 1, "trial": 0, "seed": ..., "actions": ..., "seconds": ...} ... {"job": 1, "done": true, "summary": {...}}
+Jobs wait in a queue, and everything queued when the pool frees up is sent to it as one batch. Each worker caches the
+boards it generated up to BOARD_CACHE_BYTES, so recently used seeds are not generated again by that worker.
+'''
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from Board import Board
+from Experiment import AGENTS, PERCENTILES, trialSeed
+from Results import RunningStats
+
+BOARD_CACHE_BYTES = 256 << 20 #Terrain and find mask bytes of the generated boards kept per worker
+LINE_LIMIT = 1 << 20 #Longest job line accepted
+
+_boards = OrderedDict() #Generated boards of this worker, (dim, seed): generatedBoard, least recently used first
+_board_bytes = 0 #Terrain and find mask bytes held by _boards
+
+
+def resolveAgent(name: str, moving_target: bool) -> str:
+    '''Experiment.AGENTS name of an agent given as an AGENTS name or as an Agent.py function with a moving target flag'''
+    if name in AGENTS:
+        return name
+    for key, (agent, board_kwargs, _) in AGENTS.items():
+        if agent.__name__ == name and board_kwargs.get("moving_target", False) == moving_target:
+            return key
+    raise Exception(f"Unknown agent {name} (moving_target={moving_target})")
+
+def generatedBoard(dim: int, seed: int) -> tuple:
+    '''(terrain, find mask, target, generator state after generating them) of Board(dim, rng=seed), all read-only
+
+    Cached, evicting the least recently used boards once they hold more than BOARD_CACHE_BYTES. The newest board is
+    always kept, however large.
+    '''
+    global _board_bytes
+    key = (dim, seed)
+    if key in _boards:
+        _boards.move_to_end(key)
+        return _boards[key]
+    board = Board(dim, rng=seed)
+    board._board.setflags(write=False)
+    board._board_mask.setflags(write=False)
+    _boards[key] = (board._board, board._board_mask, board.target, board.rng.bit_generator.state)
+    _board_bytes += board._board.nbytes + board._board_mask.nbytes
+    while _board_bytes > BOARD_CACHE_BYTES and len(_boards) > 1:
+        terrain, mask, _, _ = _boards.popitem(last=False)[1]
+        _board_bytes -= terrain.nbytes + mask.nbytes
+    return _boards[key]
+
+def cachedBoard(dim: int, seed: int, **board_kwargs) -> Board:
+    '''Fresh Board equal to Board(dim, rng=seed, **board_kwargs), built from the worker's cache'''
+    terrain, mask, target, state = generatedBoard(dim, seed)
+    rng = np.random.default_rng()
+    rng.bit_generator.state = state
+    return Board(dim, copy_board=terrain, copy_target=target, rng=rng, board_mask=mask, **board_kwargs)
+
+def runServiceTask(task: tuple) -> tuple:
+    '''Run one trial in a worker, task is (agent name, dim, board seed). Returns (actions, wall time)'''
+    name, dim, seed = task
+    agent, board_kwargs, kwargs = AGENTS[name]
+    board = cachedBoard(dim, seed, **board_kwargs)
+    start = time.perf_counter()
+    actions = agent(board, **kwargs)
+    end = time.perf_counter()
+    return int(actions), end-start
+
+
+class Job:
+    '''A parsed job, its results are put on self.results as they arrive, followed by None'''
+
+    def __init__(self, number: int, spec: dict):
+        self.number = number
+        self.name = resolveAgent(spec["agent"], bool(spec.get("moving_target", False)))
+        self.dim = int(spec["dim"])
+        if self.dim <= 0:
+            raise Exception("Invalid board dimension")
+        if "seeds" in spec:
+            self.seeds = [int(seed) for seed in spec["seeds"]]
+        else:
+            self.seeds = [trialSeed(int(spec.get("seed", 0)), trial) for trial in range(int(spec.get("trials", 1)))]
+        self.results = queue.Queue()
+
+
+class Dispatcher:
+    '''Feeds queued jobs to a warm pool, batching every job waiting when the pool frees up into one submission'''
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.pool = ProcessPoolExecutor(workers) #Unlike a Pool, fails the pending results when a worker dies
+        self.jobs = queue.Queue()
+        self._numbers = iter(range(1, sys.maxsize))
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, spec: dict) -> Job:
+        with self._lock:
+            job = Job(next(self._numbers), spec)
+        self.jobs.put(job)
+        return job
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.jobs.get()]
+            while True:
+                try:
+                    batch.append(self.jobs.get_nowait())
+                except queue.Empty:
+                    break
+            tasks = [(job, trial) for job in batch for trial in range(len(job.seeds))]
+            chunksize = max(1, len(tasks) // (self.workers*4))
+            finished = set() #Jobs of the batch whose every result was delivered
+            try:
+                results = self.pool.map(runServiceTask, [(job.name, job.dim, job.seeds[trial]) for job, trial in tasks], chunksize=chunksize)
+                for (job, trial), (actions, seconds) in zip(tasks, results):
+                    job.results.put({"job": job.number, "trial": trial, "seed": job.seeds[trial], "actions": actions, "seconds": seconds})
+                    if trial == len(job.seeds) - 1:
+                        job.results.put(None)
+                        finished.add(job.number)
+            except Exception as error: #A failed trial fails every job of the batch that hasn't finished
+                if isinstance(error, BrokenProcessPool): #A worker died, later batches need a working pool
+                    self.pool.shutdown(wait=False, cancel_futures=True)
+                    self.pool = ProcessPoolExecutor(self.workers)
+                for job in batch:
+                    if job.number not in finished:
+                        job.results.put({"job": job.number, "error": repr(error)})
+            for job in batch:
+                if job.number not in finished:
+                    job.results.put(None)
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class JobHandler(socketserver.StreamRequestHandler):
+    '''Reads job lines from a connection and streams back the results of each job in turn'''
+
+    def handle(self) -> None:
+        while True:
+            line = self.rfile.readline(LINE_LIMIT + 1) #Bounded, so a client that never sends a newline can't fill memory
+            if not line:
+                break
+            if len(line) > LINE_LIMIT:
+                while line and not line.endswith(b"\n"): #Skip the rest of the line in bounded reads
+                    line = self.rfile.readline(LINE_LIMIT + 1)
+                self._send({"error": "job line too long"})
+                continue
+            if not line.strip():
+                continue
+            try:
+                job = self.server.dispatcher.submit(json.loads(line))
+            except Exception as error:
+                self._send({"error": repr(error)})
+                continue
+            actions, times, failed = RunningStats(PERCENTILES), RunningStats(PERCENTILES), False
+            while True:
+                result = job.results.get()
+                if result is None:
+                    break
+                failed = failed or "error" in result
+                if not failed:
+                    actions.add(result["actions"])
+                    times.add(result["seconds"])
+                self._send(result)
+            summary = {"actions": actions.summary(), "seconds": times.summary()} if actions.count and not failed else None
+            self._send({"job": job.number, "done": True, "summary": summary})
+
+    def _send(self, message: dict) -> None:
+        self.wfile.write((json.dumps(message) + "\n").encode())
+        self.wfile.flush()
+
+
+class UnixService(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class TCPService(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def parseAddress(address: str):
+    '''Unix socket path, or (host, port) for a port or host:port'''
+    if address.isdigit():
+        return ("127.0.0.1", int(address))
+    host, _, port = address.rpartition(":")
+    if port.isdigit() and "/" not in address:
+        return (host or "127.0.0.1", int(port))
+    return address
+
+def serve(address: str, workers=1) -> None:
+    '''Run the service until interrupted'''
+    parsed = parseAddress(address)
+    if isinstance(parsed, str):
+        if os.path.exists(parsed):
+            os.remove(parsed)
+        server = UnixService(parsed, JobHandler)
+    else:
+        server = TCPService(parsed, JobHandler)
+    server.dispatcher = Dispatcher(workers)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0)) #Clean up the socket when stopped with kill as well
+    try:
+        server.serve_forever()
+    finally:
+        server.dispatcher.close()
+        server.server_close()
+        if isinstance(parsed, str) and os.path.exists(parsed):
+            os.remove(parsed)
+
+def submit(address: str, spec: dict):
+    '''Send a job to a running service and yield its result messages as they arrive, ending with the summary'''
+    parsed = parseAddress(address)
+    family = socket.AF_UNIX if isinstance(parsed, str) else socket.AF_INET
+    with socket.socket(family, socket.SOCK_STREAM) as connection:
+        connection.connect(parsed)
+        connection.sendall((json.dumps(spec) + "\n").encode())
+        with connection.makefile("r") as replies:
+            for line in replies:
+                message = json.loads(line)
+                yield message
+                if message.get("done") or ("error" in message and "job" not in message):
+                    return
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    if len(args) in (2, 3) and args[0] == "serve":
+        serve(args[1], int(args[2]) if len(args) == 3 else 1)
+        return 0
+    if len(args) == 3 and args[0] == "submit":
+        for message in submit(args[1], json.loads(args[2])):
+            print(json.dumps(message), flush=True)
+        return 0
+    print(__doc__)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+'''Board arrays in shared memory, so pool workers attach to them by name instead of receiving pickled copies
+
+The parent publishes arrays into one segment with SharedArrays and puts its spec, a small picklable tuple, in the tasks.
+Workers attach(spec) to get read-only views, kept open for the life of the worker, and build boards on them that only
+allocate their own belief. Only the owner unlinks the segment: when it is closed, garbage collected or the interpreter
+exits. A crashing worker owns nothing, and if the owner itself is killed the multiprocessing resource tracker, which
+every SharedMemory registers with, unlinks the segment once the owner is gone.
+'''
+
+import weakref
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from Board import Board
+from Storage import makeRng
+
+ALIGN = 64 #Byte alignment of every array in a segment
+
+_attached = {} #Segments attached by this process, segment name: (SharedMemory, {array name: read-only view})
+
+
+def _release(memory: shared_memory.SharedMemory) -> None:
+    '''Unmap and unlink a segment, views still alive keep the mapping until they are gone'''
+    try:
+        memory.close()
+    except BufferError: #Views were exported, the mapping goes with the last of them
+        pass
+    try:
+        memory.unlink()
+    except FileNotFoundError:
+        pass
+    return
+
+
+class SharedArrays:
+    '''Owner of a shared memory segment holding copies of the given arrays, use as a context manager or close()
+
+    empty is {name: (shape, dtype)} of further arrays to allocate without copying anything in, for the owner to fill
+    through views() piece by piece, e.g. one scenario at a time rather than from a stacked copy of them all.
+    '''
+
+    def __init__(self, arrays: dict, empty=None):
+        arrays = {name: np.asarray(array) for name, array in arrays.items()}
+        shapes = {name: (array.shape, array.dtype) for name, array in arrays.items()}
+        shapes.update(empty or {})
+        layout, size = {}, 0
+        for name, (shape, dtype) in shapes.items():
+            dtype = np.dtype(dtype)
+            size = -(-size // ALIGN) * ALIGN
+            layout[name] = (size, tuple(shape), dtype.str)
+            size += int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        self._memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self._finalizer = weakref.finalize(self, _release, self._memory)
+        self.spec = (self._memory.name, layout)
+        views = self.views()
+        for name, array in arrays.items():
+            views[name][...] = array
+
+    def views(self) -> dict:
+        '''{name: writable view} of the arrays in the segment, for the owner only, drop them before close()'''
+        return {name: np.ndarray(shape, dtype=dtype, buffer=self._memory.buf, offset=offset) for name, (offset, shape, dtype) in self.spec[1].items()}
+
+    def close(self) -> None:
+        detach(self.spec)
+        self._finalizer()
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def attach(spec: tuple) -> dict:
+    '''{name: read-only view} of the arrays of a SharedArrays spec, attached once per process'''
+    name, layout = spec
+    if name not in _attached:
+        #Attaching registers the segment with the resource tracker the owner shares with its workers, which the owner's
+        #unlink clears again, so workers must not unregister it themselves
+        memory = shared_memory.SharedMemory(name=name)
+        arrays = {}
+        for key, (offset, shape, dtype) in layout.items():
+            arrays[key] = np.ndarray(shape, dtype=dtype, buffer=memory.buf, offset=offset)
+            arrays[key].flags.writeable = False
+        _attached[name] = (memory, arrays)
+    return _attached[name][1]
+
+def detach(spec: tuple) -> None:
+    '''Drop this process's attachment to a segment, its views stay valid while they are referenced'''
+    attachment = _attached.pop(spec[0], None)
+    if attachment is not None:
+        try:
+            attachment[0].close()
+        except BufferError:
+            pass
+    return
+
+
+def boardArrays(board: Board) -> dict:
+    '''Arrays of a board to publish with SharedArrays, the find mask only when the storage profile keeps one'''
+    arrays = {"terrain": board._board, "belief": board.board}
+    if isinstance(board._board_mask, np.ndarray):
+        arrays["mask"] = board._board_mask
+    return arrays
+
+def sharedBoard(spec: tuple, target: tuple, rng=None, **board_kwargs) -> Board:
+    '''Board on the shared terrain and find mask of a published boardArrays, with its own copy of the belief
+
+    board_kwargs must match the storage profile of the published board, and the published mask is only used when
+    they keep its false negative rates.
+    '''
+    arrays = attach(spec)
+    terrain = arrays["terrain"]
+    mask = arrays.get("mask") if board_kwargs.get("false_negative_rates") is None else None
+    return Board(len(terrain), copy_board=terrain, copy_target=target, rng=makeRng(rng), board_mask=mask, belief=arrays["belief"].copy(), **board_kwargs)
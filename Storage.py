@@ -0,0 +1,87 @@
+'''Storage profiles for the per-cell arrays of a Board'''
+
+import numpy as np
+
+TERRAIN_WEIGHTS = [0.2, 0.3, 0.3, 0.2] #Probability of each terrain code when generating a board
+FIND_RATES = [0.9, 0.7, 0.3, 0.1] #Probability of finding the target in a cell of each terrain, indexed by terrain code
+MISS_RATES = [0.1, 0.3, 0.7, 0.9] #False negative rate of each terrain, kept as written so beliefs match 1 - FIND_RATES exactly
+UNIFORM_BUFFER = 4096 #Uniforms drawn from a board's generator at a time
+
+#profile: (terrain dtype, belief dtype, cleared timestamp dtype, store the find mask)
+PROFILES = {
+    "default": (np.int64, np.float64, np.int64, True), #32 bytes per cell
+    "compact": (np.uint8, np.float32, np.uint16, False), #7 bytes per cell, the mask is looked up from the terrain
+}
+
+GENERATION_CHUNK = 1 << 20 #Cells generated per batch of uniforms, bounds the float64 draws made along the way
+
+
+class LookupMask:
+    '''Read-only stand-in for the find mask array that computes lut[terrain] on access instead of storing it
+
+    Indexing only looks up the selected cells, and using it in array arithmetic materializes it in the lut dtype.
+    '''
+
+    def __init__(self, terrain: np.ndarray, lut: np.ndarray):
+        self._terrain = terrain
+        self._lut = lut
+        self.shape = terrain.shape
+        self.dtype = lut.dtype
+        self.ndim = terrain.ndim
+
+    def __getitem__(self, key):
+        return self._lut[self._terrain[key]]
+
+    def __array__(self, dtype=None, copy=None):
+        mask = np.take(self._lut, self._terrain)
+        return mask if dtype is None else mask.astype(dtype, copy=False)
+
+    def __len__(self) -> int:
+        return len(self._terrain)
+
+    def ravel(self):
+        return LookupMask(self._terrain.ravel(), self._lut)
+
+
+def makeRng(rng=None) -> np.random.Generator:
+    '''Generator from a Generator, a seed, or None to draw a seed from the global numpy state (so np.random.seed still applies)'''
+    if isinstance(rng, np.random.Generator):
+        return rng
+    if rng is None:
+        rng = np.random.randint(2**32, size=4)
+    return np.random.default_rng(rng)
+
+def checkSensorModel(terrain_weights, miss_rates) -> None:
+    '''Raise ValueError unless there is one nonnegative terrain weight (not all 0) per miss rate, each in [0, 1]'''
+    miss_rates = np.asarray(miss_rates, dtype=float)
+    if miss_rates.ndim != 1 or len(miss_rates) == 0 or not ((miss_rates >= 0) & (miss_rates <= 1)).all():
+        raise ValueError(f"False negative rates should be a list of rates in [0, 1], got {miss_rates.tolist()}")
+    if terrain_weights is None:
+        return
+    weights = np.asarray(terrain_weights, dtype=float)
+    if weights.shape != miss_rates.shape:
+        raise ValueError(f"{len(np.atleast_1d(weights))} terrain weights given for {len(miss_rates)} terrain codes with find rates")
+    if not (weights >= 0).all() or weights.sum() <= 0:
+        raise ValueError(f"Terrain weights should be nonnegative and not all 0, got {weights.tolist()}")
+    return
+
+def generateTerrain(dim: int, dtype, out=None, rng=None, weights=TERRAIN_WEIGHTS) -> np.ndarray:
+    '''Random terrain in dtype, drawn in row chunks so no full size int64 or float64 array is made
+
+    One uniform is drawn per cell in order, so the chunks give the same terrain as a single draw. out can be any
+    (dim, dim) array to write into, such as a memory map.
+    '''
+    rng = makeRng(rng)
+    cdf = np.cumsum(weights, dtype=float)
+    cdf /= cdf[-1]
+    terrain = np.empty((dim, dim), dtype=dtype) if out is None else out
+    rows = max(1, GENERATION_CHUNK // dim)
+    for start in range(0, dim, rows):
+        end = min(dim, start+rows)
+        terrain[start:end] = cdf.searchsorted(rng.random((end-start, dim)), side='right')
+    return terrain
+
+def cellBytes(profile: str) -> int:
+    '''Bytes stored per cell by a profile for a moving target board'''
+    terrain, belief, cleared, stored_mask = PROFILES[profile]
+    return np.dtype(terrain).itemsize + np.dtype(belief).itemsize + np.dtype(cleared).itemsize + (np.dtype(belief).itemsize if stored_mask else 0)
@@ -0,0 +1,154 @@
+'''Parameter sweeps over a grid of configurations, with results cached on disk
+
+A configuration is a dict with the agent (a name of Experiment.AGENTS), the board dim, and any of BOARD_PARAMETERS and
+AGENT_PARAMETERS, e.g. {"agent": "Modified Improved Agent", "dim": 30, "tries": 3, "nearby_radius": 4}. The actions of
+trial t of a configuration are cached under a hash of the configuration, the base seed and the code version, and
+trial t always runs on the board of Experiment.trialSeed(seed, t). So a rerun loads everything, more trials only run
+the trials past the cached ones, and an extended grid only runs the new configurations.
+'''
+
+import hashlib
+import itertools
+import json
+import os
+import time
+from functools import lru_cache
+from inspect import signature
+from multiprocessing import Pool
+
+import numpy as np
+
+from Board import Board, DISTANCE_WEIGHTS
+from Experiment import AGENTS, trialSeed
+from Storage import MISS_RATES, TERRAIN_WEIGHTS, checkSensorModel
+
+CACHE_DIR = "sweep_cache"
+
+#Configuration keys passed to the Board, and to the agent
+BOARD_PARAMETERS = ("terrain_weights", "false_negative_rates", "nearby_radius", "distance_weights")
+AGENT_PARAMETERS = ("tries",)
+
+
+@lru_cache(maxsize=1)
+def codeVersion() -> str:
+    '''Hash of the source files of the package and the numpy version, cached results of other versions are not reused'''
+    digest = hashlib.sha256(np.__version__.encode())
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".py"):
+            with open(os.path.join(directory, name), "rb") as source:
+                digest.update(name.encode() + b"\0" + source.read())
+    return digest.hexdigest()
+
+def checkConfig(config: dict) -> dict:
+    '''config in canonical JSON form (tuples become lists, numbers the type the Board uses), raises on unknown agents
+    and parameters and on board parameters the Board would reject, so a bad configuration fails before any trial runs'''
+    config = json.loads(json.dumps(config))
+    if config.get("agent") not in AGENTS:
+        raise Exception(f"Unknown agent {config.get('agent')}, choose from: {', '.join(AGENTS)}")
+    config["dim"] = int(config.get("dim", 0))
+    if config["dim"] <= 0:
+        raise Exception("Invalid board dimension")
+    try:
+        for key in ("terrain_weights", "false_negative_rates"):
+            if key in config:
+                config[key] = [float(value) for value in config[key]]
+        checkSensorModel(config.get("terrain_weights", TERRAIN_WEIGHTS), config.get("false_negative_rates", MISS_RATES))
+        if "nearby_radius" in config:
+            config["nearby_radius"] = int(config["nearby_radius"])
+            if config["nearby_radius"] < 0:
+                raise ValueError("The nearby radius should be at least 0")
+        if "distance_weights" in config:
+            config["distance_weights"] = [[float(scale), float(offset)] for scale, offset in config["distance_weights"]]
+            if len(config["distance_weights"]) != len(DISTANCE_WEIGHTS) or min(scale for scale, _ in config["distance_weights"]) < 0:
+                raise ValueError(f"Distance weights should be {len(DISTANCE_WEIGHTS)} (scale, offset) pairs with scales of at least 0")
+    except (TypeError, ValueError) as error:
+        raise Exception(f"Invalid board parameters in {config}: {error}")
+    agent = AGENTS[config["agent"]][0]
+    for key in config:
+        if key in ("agent", "dim") or key in BOARD_PARAMETERS:
+            continue
+        if key not in AGENT_PARAMETERS:
+            raise Exception(f"Unknown parameter {key}")
+        if key not in signature(agent).parameters:
+            raise Exception(f"{config['agent']} has no parameter {key}")
+    if "tries" in config:
+        config["tries"] = int(config["tries"])
+        if config["tries"] <= 0:
+            raise Exception("Invalid number of tries")
+    return config
+
+def configKey(config: dict, seed: int) -> str:
+    '''Cache key of a configuration and base seed under the current code version'''
+    payload = json.dumps({"config": config, "seed": seed, "version": codeVersion()}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def grid(base: dict, axes: dict) -> list:
+    '''Configurations of base with every combination of the values of axes, {key: [values]}, the last key varying fastest'''
+    keys = list(axes)
+    return [dict(base, **dict(zip(keys, values))) for values in itertools.product(*(axes[key] for key in keys))]
+
+
+class ResultCache:
+    '''Directory of per configuration results, each an .npz file of the actions and wall times in trial order'''
+
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".npz")
+
+    def load(self, key: str) -> tuple:
+        '''(actions, times) cached under key, empty if there are none'''
+        if not os.path.exists(self.path(key)):
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        with np.load(self.path(key)) as saved:
+            return saved["actions"], saved["seconds"]
+
+    def store(self, key: str, config: dict, seed: int, actions: np.ndarray, times: np.ndarray) -> None:
+        '''Write the results of key, replacing the file at once so readers never see it half written'''
+        temporary = f"{self.path(key)}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as output:
+            np.savez(output, actions=actions, seconds=times, meta=np.array(json.dumps({"config": config, "seed": seed, "version": codeVersion()})))
+        os.replace(temporary, self.path(key))
+        return
+
+
+def runConfigTrial(task: tuple) -> tuple:
+    '''Run one trial of a configuration, task is (config, base seed, trial number). Returns (actions, wall time)'''
+    config, seed, trial = task
+    agent, board_kwargs, kwargs = AGENTS[config["agent"]]
+    board_kwargs = dict(board_kwargs, **{key: value for key, value in config.items() if key in BOARD_PARAMETERS})
+    kwargs = dict(kwargs, **{key: value for key, value in config.items() if key in AGENT_PARAMETERS})
+    start = time.perf_counter()
+    actions = agent(Board(config["dim"], rng=trialSeed(seed, trial), **board_kwargs), **kwargs)
+    end = time.perf_counter()
+    return int(actions), end-start
+
+def sweep(configs: list, trials: int, workers=1, seed=0, cache_dir=CACHE_DIR) -> list:
+    '''(config, actions, wall times, trials run) for trials trials of every configuration, in the order of configs
+
+    Only the trials missing from the cache are run, those of all configurations sharing one process pool.
+    '''
+    cache = ResultCache(cache_dir)
+    configs = [checkConfig(config) for config in configs]
+    keys = [configKey(config, seed) for config in configs]
+    cached = [cache.load(key) for key in keys]
+    tasks = [(config, seed, trial) for config, (actions, _) in zip(configs, cached) for trial in range(len(actions), trials)]
+    if workers <= 1:
+        results = [runConfigTrial(task) for task in tasks]
+    else:
+        with Pool(workers) as pool:
+            results = pool.map(runConfigTrial, tasks, chunksize=max(1, len(tasks) // (workers*4)))
+    swept, done = [], 0
+    for config, key, (actions, times) in zip(configs, keys, cached):
+        missing = max(0, trials - len(actions))
+        if missing:
+            new = results[done:done+missing]
+            done += missing
+            actions = np.concatenate((actions, np.array([result[0] for result in new], dtype=np.int64)))
+            times = np.concatenate((times, np.array([result[1] for result in new])))
+            cache.store(key, config, seed, actions, times)
+        swept.append((config, actions[:trials], times[:trials], missing))
+    return swept
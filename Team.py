@@ -0,0 +1,81 @@
+'''Vectorized cell selection for K searchers sharing one board
+
+Cells are passed around as flat board indices, one per searcher, so a whole team is an integer array.
+'''
+
+import numpy as np
+
+CHUNK_CELLS = 1 << 22 #Scores held at once by the distance heuristic, as searchers x board cells
+
+
+def smallest(scores: np.ndarray, k: int) -> np.ndarray:
+    '''(rows, k) column indices of the k smallest scores of every row, ordered by score then index like repeated argmin
+
+    A partition finds the kth score, everything below it is taken and the cells tied at it fill the rest lowest index
+    first, where argpartition would pick any of them.
+    '''
+    scores = np.atleast_2d(scores)
+    kth = np.partition(scores, k-1, axis=1)[:, k-1:k]
+    below = scores < kth
+    need = k - below.sum(axis=1, keepdims=True)
+    tied = scores == kth
+    chosen = below | (tied & (np.cumsum(tied, axis=1) <= need))
+    columns = np.nonzero(chosen)[1].reshape(len(scores), k)
+    order = np.lexsort((columns, np.take_along_axis(scores, columns, axis=1)), axis=1)
+    return np.take_along_axis(columns, order, axis=1)
+
+def assign(candidates: np.ndarray, costs: np.ndarray) -> np.ndarray:
+    '''Distinct cell for every searcher, candidates and costs are (K, M) with each row sorted by cost and M >= K
+
+    Every round, each searcher without a cell proposes its cheapest candidate nobody holds, and every cell goes to its
+    cheapest proposer (the lowest searcher on ties). A searcher is blocked by at most K-1 cells, so M >= K always
+    leaves it a candidate.
+    '''
+    searchers = len(candidates)
+    assigned = np.full(searchers, -1, dtype=np.int64)
+    taken = np.zeros(candidates.max()+1, dtype=bool)
+    waiting = np.arange(searchers)
+    while len(waiting):
+        pointer = np.argmin(taken[candidates[waiting]], axis=1) #First candidate nobody holds
+        cells = candidates[waiting, pointer]
+        order = np.lexsort((waiting, costs[waiting, pointer], cells))
+        first = np.r_[True, cells[order][1:] != cells[order][:-1]] #Cheapest proposer of every cell
+        winners = order[first]
+        assigned[waiting[winners]] = cells[winners]
+        taken[cells[winners]] = True
+        waiting = waiting[assigned[waiting] < 0]
+    return assigned
+
+def distances(dim: int, cells: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    '''(len(cells), len(targets)) manhattan distances between flat cells'''
+    rows, cols = np.divmod(cells, dim)
+    target_rows, target_cols = np.divmod(targets, dim)
+    return np.abs(rows[:, None] - target_rows[None, :]) + np.abs(cols[:, None] - target_cols[None, :])
+
+def assignNearest(dim: int, positions: np.ndarray, cells: np.ndarray) -> np.ndarray:
+    '''Send every searcher to a distinct cell of cells (as many as searchers), preferring the nearest'''
+    walk = distances(dim, positions, cells)
+    order = smallest(walk, len(cells))
+    return assign(cells[order], np.take_along_axis(walk, order, axis=1))
+
+def distanceCandidates(find: np.ndarray, positions: np.ndarray, k: int) -> tuple:
+    '''(candidates, costs), the k cells with the lowest (manhattan distance + 1)/find score for every searcher
+
+    Same scores as Board.bestDistNumpy, computed for a chunk of searchers at a time to bound the memory.
+    '''
+    dim = find.shape[0]
+    cells = np.arange(dim, dtype=find.dtype)
+    rows, cols = np.divmod(positions, dim)
+    candidates = np.empty((len(positions), k), dtype=np.int64)
+    costs = np.empty((len(positions), k), dtype=find.dtype)
+    chunk = max(1, CHUNK_CELLS // dim**2)
+    for start in range(0, len(positions), chunk):
+        end = min(len(positions), start+chunk)
+        scores = np.abs(cells[None, :, None] - rows[start:end, None, None]) + np.abs(cells[None, None, :] - cols[start:end, None, None])
+        scores += 1
+        with np.errstate(divide='ignore', over='ignore'): #Zero or underflowed beliefs score inf
+            np.divide(scores, find, out=scores)
+        scores = scores.reshape(end-start, -1)
+        candidates[start:end] = smallest(scores, k)
+        costs[start:end] = np.take_along_axis(scores, candidates[start:end], axis=1)
+    return candidates, costs
@@ -0,0 +1,115 @@
+'''Disk backed board arrays and tile by tile queries over them'''
+
+import numpy as np
+
+from Storage import GENERATION_CHUNK, generateTerrain
+
+
+def _openMap(path: str, dim: int, dtype, mode: str) -> np.ndarray:
+    '''Memory map a (dim, dim) array, .npy files carry their own shape and dtype, anything else is read as raw'''
+    if path.endswith(".npy"):
+        if mode == "w+":
+            return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(dim, dim))
+        return np.load(path, mmap_mode=mode)
+    return np.memmap(path, dtype=dtype, mode=mode, shape=(dim, dim))
+
+def createTerrain(path: str, dim: int, dtype=np.uint8, rng=None) -> np.ndarray:
+    '''Generate random terrain straight into a file in row chunks and return it memory mapped'''
+    terrain = _openMap(path, dim, dtype, "w+")
+    generateTerrain(dim, dtype, out=terrain, rng=rng)
+    terrain.flush()
+    return terrain
+
+def createBelief(path: str, dim: int, dtype=np.float32) -> np.ndarray:
+    '''Create a uniform belief file in row chunks and return it memory mapped for reading and writing'''
+    belief = _openMap(path, dim, dtype, "w+")
+    rows = max(1, GENERATION_CHUNK // dim)
+    for start in range(0, dim, rows):
+        belief[start:start+rows] = 1/(dim**2)
+    belief.flush()
+    return belief
+
+def openTerrain(path: str, dim=None, dtype=np.uint8) -> np.ndarray:
+    '''Memory map existing terrain read-only, dim is only needed for raw files'''
+    return _openMap(path, dim, dtype, "r")
+
+def openBelief(path: str, dim=None, dtype=np.float32) -> np.ndarray:
+    '''Memory map an existing belief for reading and writing, dim is only needed for raw files'''
+    return _openMap(path, dim, dtype, "r+")
+
+
+class TileIndex:
+    '''Cached maximum and argmax of score(row slice, col slice) for every tile of a board
+
+    Only tiles marked dirty are rescanned by a query, so a step that changes one cell reads one tile.
+    '''
+
+    def __init__(self, dim: int, tile: int, score):
+        self.dim = dim
+        self.tile = tile
+        self._score = score
+        count = -(-dim // tile)
+        self._max = np.full((count, count), -np.inf)
+        self._arg = np.zeros((count, count), dtype=np.int64) #Flat board index of each tile's maximum
+        self._dirty = np.ones((count, count), dtype=bool)
+        edges = np.arange(count) * tile
+        self.starts = edges #First row (and col) of each tile row (and tile col)
+        self.ends = np.minimum(edges + tile, dim)
+
+    def markDirty(self, pos: tuple) -> None:
+        self._dirty[pos[0] // self.tile, pos[1] // self.tile] = True
+        return
+
+    def markAll(self) -> None:
+        self._dirty[:] = True
+        return
+
+    def slices(self, tile_row: int, tile_col: int) -> tuple:
+        return slice(self.starts[tile_row], self.ends[tile_row]), slice(self.starts[tile_col], self.ends[tile_col])
+
+    def maxima(self) -> np.ndarray:
+        '''Per tile maxima after rescanning the dirty tiles'''
+        for tile_row, tile_col in zip(*np.nonzero(self._dirty)):
+            rows, cols = self.slices(tile_row, tile_col)
+            scores = self._score(rows, cols)
+            best = scores.argmax()
+            width = cols.stop - cols.start
+            self._max[tile_row, tile_col] = scores.flat[best]
+            self._arg[tile_row, tile_col] = (rows.start + best // width) * self.dim + cols.start + best % width
+        self._dirty[:] = False
+        return self._max
+
+    def argmax(self) -> int:
+        '''Flat index of the board maximum, ties go to the first cell in row-major order like np.argmax'''
+        maxima = self.maxima()
+        return int(self._arg[maxima == maxima.max()].min())
+
+
+def tiledDistanceSearch(board: np.ndarray, mask, pos: tuple, weight, find_tiles: TileIndex) -> tuple:
+    '''Cell minimizing weight(manhattan distance)/(board*mask), scanning tiles in order of a lower bound on their scores
+
+    A tile can score no lower than weight(distance from pos to the tile)/(tile maximum of board*mask), so tiles whose
+    bound is above the best score found are never read. weight must be nondecreasing in the distance.
+    '''
+    row, col = pos
+    maxima = find_tiles.maxima()
+    row_gap = np.maximum(0, np.maximum(find_tiles.starts - row, row - (find_tiles.ends - 1)))
+    col_gap = np.maximum(0, np.maximum(find_tiles.starts - col, col - (find_tiles.ends - 1)))
+    with np.errstate(divide='ignore', over='ignore'): #Zero or underflowed beliefs score inf
+        #Computed in the score dtype, rounding is monotonic so no cell can round below its tile's bound
+        bounds = np.divide(np.asarray(weight(row_gap[:, None] + col_gap[None, :]), dtype=board.dtype), maxima.astype(board.dtype))
+    best_score, best_flat = np.inf, None
+    for tile in np.argsort(bounds, axis=None, kind='stable'):
+        tile_row, tile_col = divmod(int(tile), bounds.shape[1])
+        if bounds[tile_row, tile_col] > best_score:
+            break #Every remaining tile has a larger bound
+        rows, cols = find_tiles.slices(tile_row, tile_col)
+        distance = np.abs(np.arange(rows.start, rows.stop) - row)[:, None] + np.abs(np.arange(cols.start, cols.stop) - col)[None, :]
+        with np.errstate(divide='ignore', over='ignore'): #Zero or underflowed beliefs score inf
+            scores = np.divide(np.asarray(weight(distance), dtype=board.dtype), board[rows, cols] * mask[rows, cols])
+        best = scores.argmin()
+        width = cols.stop - cols.start
+        flat = (rows.start + best // width) * find_tiles.dim + cols.start + best % width
+        if best_flat is None or scores.flat[best] < best_score or (scores.flat[best] == best_score and flat < best_flat):
+            best_score, best_flat = scores.flat[best], flat
+    return best_flat // find_tiles.dim, best_flat % find_tiles.dim
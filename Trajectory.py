@@ -0,0 +1,170 @@
+'''Compact recording of agent runs, and replay of the board as it was at any step of one
+
+A Recorder is a probe (see Instrument.py), so any agent records its run with probe=Recorder(). Every step becomes a row
+of typed columns: the cell searched, the distance walked to it, the nearby signal, where the target was and the highest
+belief. Meanwhile the board writes every change of its state to the recorder's journal, and the recorder snapshots the
+board state every snapshot_every steps. A Replay rebuilds the board at a step from the snapshot before it plus the
+journal since, without running the agent again.
+'''
+
+import json
+
+import numpy as np
+
+from Board import Board, EXPLORED, UPDATED, TARGET_MOVED, CLEARED_AROUND, NEARBY, CLOCK_TICK, CONDITIONED, PREDICTED
+from Checkpoint import boardState, loadBoardState
+from Instrument import NullProbe
+
+SNAPSHOT_EVERY = 1000 #Steps between board snapshots, a replay reapplies at most this many steps of the journal
+INITIAL_ROWS = 1024
+
+#Per step columns. cell is -1 when the step explored no single cell (a team step that missed the target), nearby is -1
+#on boards without a moving target and ops is the length of the journal at the step
+STEP_COLUMNS = {"cell": np.int64, "walk": np.int64, "nearby": np.int8, "target": np.int64, "max_belief": np.float64, "ops": np.int64}
+OP_COLUMNS = {"op": np.int8, "a": np.int64, "b": np.int64}
+
+
+class Columns:
+    '''Rows of typed columns in preallocated arrays, which double in size when they fill up'''
+
+    def __init__(self, columns: dict, rows=INITIAL_ROWS):
+        self._arrays = {name: np.empty(rows, dtype=dtype) for name, dtype in columns.items()}
+        self._columns = list(self._arrays.values())
+        self._rows = 0
+
+    def append(self, *values) -> None:
+        if self._rows == len(self._columns[0]):
+            for name, array in self._arrays.items():
+                self._arrays[name] = np.concatenate((array, np.empty_like(array)))
+            self._columns = list(self._arrays.values())
+        for column, value in zip(self._columns, values):
+            column[self._rows] = value
+        self._rows += 1
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def column(self, name: str) -> np.ndarray:
+        '''The filled part of a column, a view'''
+        return self._arrays[name][:self._rows]
+
+
+class Recorder(NullProbe):
+    '''Probe recording every step of a run and the journal of board changes, see save and Replay'''
+
+    def __init__(self, snapshot_every=SNAPSHOT_EVERY):
+        self.snapshot_every = snapshot_every
+        self.steps = Columns(STEP_COLUMNS)
+        self.journal = Columns(OP_COLUMNS)
+        self.snapshots = [] #(step, journal length, arrays, meta)
+        self.actions = None
+        self._walked = 0
+        self._explored = 0 #Journal length at the previous step
+
+    def begin(self, board) -> None:
+        self.board_meta = {"dim": board.dim, "moving_target": board._moving, "storage": board._storage, "miss_rates": board._miss_rates.tolist(),
+                           "belief_filter": hasattr(board, "_inv_degree"), "nearby_radius": board._nearby_radius, "distance_weights": board._distance_weights}
+        self.terrain = np.array(board._board)
+        self.snapshots.append((0, 0, *boardState(board)))
+        self._board = board
+        board._journal = self.journal
+
+    def walk(self, distance) -> None:
+        self._walked += int(distance)
+
+    def step(self, board) -> None:
+        ops = len(self.journal)
+        explored = np.flatnonzero(self.journal.column("op")[self._explored:] == EXPLORED)
+        cell = int(self.journal.column("a")[self._explored + explored[-1]]) if len(explored) else -1
+        nearby = board.manhattan(divmod(cell, board.dim), board.target) <= board._nearby_radius if board._moving and cell >= 0 else -1
+        max_belief = board.board[board.bestContains()]
+        self.steps.append(cell, self._walked, nearby, board.target[0]*board.dim + board.target[1], max_belief, ops)
+        self._walked = 0
+        self._explored = ops
+        if len(self.steps) % self.snapshot_every == 0:
+            self.snapshots.append((len(self.steps), ops, *boardState(board)))
+
+    def end(self, actions) -> None:
+        self.actions = int(actions)
+        self._board._journal = None #Later changes are not part of the run
+
+    def save(self, path: str) -> None:
+        '''Write the recording to path as a compressed .npz file'''
+        arrays = {"terrain": self.terrain}
+        for name in STEP_COLUMNS:
+            arrays["step_" + name] = self.steps.column(name)
+        for name in OP_COLUMNS:
+            arrays["op_" + name] = self.journal.column(name)
+        snapshots = []
+        for number, (step, ops, snapshot_arrays, snapshot_meta) in enumerate(self.snapshots):
+            for name, array in snapshot_arrays.items():
+                arrays[f"snapshot{number}_{name}"] = array
+            snapshots.append({"step": step, "ops": ops, "arrays": list(snapshot_arrays), "meta": snapshot_meta})
+        meta = {"board": self.board_meta, "actions": self.actions, "snapshots": snapshots}
+        np.savez_compressed(path, meta=np.array(json.dumps(meta)), **arrays)
+
+
+class Replay:
+    '''A recording saved by Recorder.save, with the board rebuilt at any step
+
+    steps holds the step columns (see STEP_COLUMNS) with cells as (row, col) pairs.
+    '''
+
+    def __init__(self, path: str):
+        with np.load(path) as saved:
+            self._meta = json.loads(str(saved["meta"]))
+            self._terrain = saved["terrain"]
+            steps = {name: saved["step_" + name] for name in STEP_COLUMNS}
+            self._ops = [saved["op_" + name] for name in OP_COLUMNS]
+            self._snapshots = [({name: saved[f"snapshot{number}_{name}"] for name in snapshot["arrays"]}, snapshot)
+                               for number, snapshot in enumerate(self._meta["snapshots"])]
+        dim = self._meta["board"]["dim"]
+        self.actions = self._meta["actions"]
+        self._step_ops = steps.pop("ops")
+        self.steps = {name: np.stack(np.divmod(values, dim), axis=1) if name in ("cell", "target") else values for name, values in steps.items()}
+        self.steps["cell"][steps["cell"] < 0] = -1
+
+    def __len__(self) -> int:
+        return len(self._step_ops)
+
+    def board(self, step: int, **board_kwargs) -> Board:
+        '''Board as it was right after exploration number step of the run (0 is before the first one), board_kwargs
+        such as indexed=True choose the query structures of the rebuilt board'''
+        if not 0 <= step <= len(self):
+            raise Exception(f"Step {step} is not in a recording of {len(self)} steps")
+        arrays, snapshot = [(arrays, snapshot) for arrays, snapshot in self._snapshots if snapshot["step"] <= step][-1]
+        meta = self._meta["board"]
+        board = Board(meta["dim"], copy_board=self._terrain.copy(), copy_target=tuple(snapshot["meta"]["target"]), moving_target=meta["moving_target"],
+                      belief_filter=meta["belief_filter"], storage=meta["storage"], false_negative_rates=meta["miss_rates"],
+                      nearby_radius=meta["nearby_radius"], distance_weights=meta["distance_weights"], rng=0, **board_kwargs)
+        loadBoardState(board, arrays, snapshot["meta"]) #Generator state included
+        codes, firsts, seconds = self._ops
+        for op in range(snapshot["ops"], self._step_ops[step-1] if step else 0):
+            _apply(board, int(codes[op]), int(firsts[op]), int(seconds[op]))
+        return board
+
+
+def _apply(board: Board, op: int, a: int, b: int) -> None:
+    '''Make the change a journal entry recorded'''
+    pos = divmod(a, board.dim)
+    if op == EXPLORED:
+        board.explore(pos) #Only draws a uniform, when the target is there
+    elif op == UPDATED:
+        board.update_probability(pos)
+    elif op == TARGET_MOVED:
+        board.target = pos
+        if b:
+            board._uniform()
+    elif op == CLEARED_AROUND:
+        board._clearAround(pos)
+    elif op == NEARBY:
+        board.isNearby(pos, b)
+    elif op == CLOCK_TICK:
+        board.update_cleared_cells()
+    elif op == CONDITIONED:
+        board._condition(pos, None if b < 0 else bool(b % 2), b // 2)
+    elif op == PREDICTED:
+        board.predict(a, bool(b))
+    else:
+        raise Exception(f"Unknown journal entry {op}")
+    return
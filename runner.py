@@ -1,7 +1,7 @@
 '''Run the various agents
 
 Valid Arguments:
-    python3 runner.py <Board Dimension> <Count Movement> <Moving Target>
+    python3 runner.py <Board Dimension> <Count Movement> <Moving Target> [<Trials> <Workers> <Seed>]
     - Maze dimension: [1, inf)
     - Count Movement: 0 (False) / 1 (True)
     - Moving Target: 0 (False) / 1 (True)
@@ -9,19 +9,130 @@ Valid Arguments:
     If "Count Movement" is false, then Rule 1 and 2 will be run. If it is true, Agent 1, Agent 2, Agent 3, and the Improved Agent will be run.
     
     If Moving Target is false, then part 1 of the assignment will be executed. If it is true, part 2 will be executed.
+    The agents run are those of Experiment.GROUPS, so with a moving target and Count Movement the belief filter agents run as well.
+
+    If Trials, Workers and Seed are given, each agent is run Trials times spread over Workers processes, and statistics of the actions and wall time are printed.
+    - Trials: [1, inf)
+    - Workers: [1, inf)
+    - Seed: any integer, the same seed and trial count give identical actions for any number of workers
+
+    python3 runner.py corpus <Corpus Path> <Board Dimension> <Scenarios> <Seed> [<Save Masks>]
+    - Corpus Path: a directory (memory mapped .npy files) or a file ending in .npz (compressed)
+    - Save Masks: 0 (False, default) / 1 (True)
+
+    python3 runner.py replay <Corpus Path> <Count Movement> <Moving Target> [<Workers>]
+    Every agent of the selected group is run on every scenario of the corpus, so all agents see identical boards. With
+    several workers a .npz corpus is decompressed once into shared memory that the workers attach to.
+
+    python3 runner.py stream <Board Dimension> <Count Movement> <Moving Target> <Trials> <Workers> <Seed> <Output> [<Report Every>]
+    Like the multi trial run, but every result is written to Output as it arrives (a .csv file, or otherwise a directory
+    of binary columns read by Results.readColumns) and only running statistics are kept, so memory does not grow with
+    Trials. With Report Every, the running summary is printed every that many trials.
+
+    python3 runner.py adaptive <Board Dimension> <Workers> <Seed> <Precision> <Agent Name> [<Agent Name> ...]
+    Paired trials of the named agents (as in Experiment.AGENTS, e.g. "Agent 3" "Improved Agent") run on shared boards in
+    batches, until every mean is within Precision (relative, 0 to ignore) or every difference between agents is
+    significant at the 95% level.
+
+    python3 runner.py team <Board Dimension> <Rule> <Trials> <Workers> <Seed> <Searchers> [<Searchers> ...]
+    - Rule: contains / find / dist, how every searcher of a team picks cells, like Agent 1, 2 and 3
+    Teams of each size search the same boards, and the mean total actions (all searchers) and wall clock actions (steps
+    taken in parallel) are printed for each size, with the speedup in wall clock actions over the first size.
+
+    python3 runner.py exact <Board Dimension> <Count Movement> <Terrains> <Workers> <Seed>
+    Exact action statistics of the stationary target agents of the group over the terrains the multi trial run would
+    use for Terrains trials: each terrain takes one pass of the agent instead of sampling targets on it (see Analytic.py).
+
+    python3 runner.py record <Board Dimension> <Agent Name> <Seed> <Output>
+    One run of the named agent on the board of Seed, with every step recorded to Output (an .npz file read by
+    Trajectory.Replay, which rebuilds the board at any step of the run).
+
+    python3 runner.py sweep <Sweep JSON> <Trials> <Workers> <Seed> [<Cache Directory>]
+    - Sweep JSON: a file holding {"base": {...}, "grid": {"key": [values], ...}}, see Sweep.py for the keys
+    - Cache Directory: default sweep_cache
+    Trials of every combination of the grid values over the base configuration, e.g. base {"agent": "Improved Agent",
+    "dim": 20} and grid {"tries": [1, 2, 3]}. Results are cached per configuration and seed, so a rerun, more trials or
+    a larger grid only run what is missing.
 '''
+import json
 import time
 import sys
 
-from Agent import rule1, rule2, basicAgent1, basicAgent2, basicAgent3, improvedAgent, moveRule1, moveRule2, moveAgent1, moveAgent2, moveAgent3, moveImprovedAgent
+from Analytic import exactTrials
 from Board import Board
+from Experiment import AGENTS, GROUPS, runTrials, runCorpus, openCorpus, streamTrials, sequentialTrials, teamScaling, summarize, formatSummary
+from Scenarios import generateCorpus
+from Sweep import CACHE_DIR, grid, sweep
+from Trajectory import Recorder
 
 
 def runner():
     args = sys.argv[1:]
+    if len(args) in (5, 6) and args[0] == "corpus":
+        count = int(args[3])
+        if int(args[2]) <= 0 or count <= 0:
+            raise Exception("Invalid board dimension or number of scenarios")
+        generateCorpus(args[1], count, int(args[2]), int(args[4]), masks=len(args) == 6 and int(args[5]) == 1)
+        return
+    if len(args) in (4, 5) and args[0] == "replay":
+        count_movement = int(args[2])
+        moving_target = int(args[3])
+        if count_movement not in (0, 1) or moving_target not in (0, 1):
+            raise Exception("Count Movement and Moving Target should be 0/1")
+        replayRunner(args[1], count_movement, moving_target, int(args[4]) if len(args) == 5 else 1)
+        return
+    if len(args) in (8, 9) and args[0] == "stream":
+        dim, count_movement, moving_target, trials, workers, seed = (int(arg) for arg in args[1:7])
+        if dim <= 0 or trials <= 0 or workers <= 0:
+            raise Exception("Invalid board dimension, number of trials or number of workers")
+        if count_movement not in (0, 1) or moving_target not in (0, 1):
+            raise Exception("Count Movement and Moving Target should be 0/1")
+        results = streamTrials(GROUPS[(moving_target, count_movement)], dim, trials, workers, seed, args[7], int(args[8]) if len(args) == 9 else 0)
+        for name, (actions_stats, time_stats) in results.items():
+            print(formatSummary(f"{name} Actions", actions_stats.summary()))
+            print(formatSummary(f"{name} Time", time_stats.summary()))
+        return
+    if len(args) >= 6 and args[0] == "adaptive":
+        dim, workers, seed = int(args[1]), int(args[2]), int(args[3])
+        precision = float(args[4])
+        if dim <= 0 or workers <= 0:
+            raise Exception("Invalid board dimension or number of workers")
+        adaptiveRunner(args[5:], dim, workers, seed, precision if precision > 0 else None)
+        return
+    if len(args) >= 7 and args[0] == "team":
+        dim, rule, trials, workers, seed = int(args[1]), args[2], int(args[3]), int(args[4]), int(args[5])
+        team_sizes = [int(arg) for arg in args[6:]]
+        if rule not in ("contains", "find", "dist"):
+            raise Exception("Rule should be contains/find/dist")
+        if dim <= 0 or trials <= 0 or workers <= 0 or min(team_sizes) <= 0 or max(team_sizes) > dim**2:
+            raise Exception("Invalid board dimension, number of trials, number of workers or team size")
+        teamRunner(team_sizes, rule, dim, trials, workers, seed)
+        return
+    if len(args) == 6 and args[0] == "exact":
+        dim, count_movement, terrains, workers, seed = (int(arg) for arg in args[1:6])
+        if dim <= 0 or terrains <= 0 or workers <= 0:
+            raise Exception("Invalid board dimension, number of terrains or number of workers")
+        if count_movement not in (0, 1):
+            raise Exception("Count Movement should be 0/1")
+        for name in GROUPS[(0, count_movement)]:
+            stats = exactTrials(name, dim, terrains, workers, seed)
+            print(formatSummary(f"{name} Actions", stats) + f", unresolved={stats['unresolved']:.2g}")
+        return
+    if len(args) == 5 and args[0] == "record":
+        dim, seed = int(args[1]), int(args[3])
+        if dim <= 0:
+            raise Exception("Invalid board dimension")
+        recordRunner(args[2], dim, seed, args[4])
+        return
+    if len(args) in (5, 6) and args[0] == "sweep":
+        trials, workers, seed = int(args[2]), int(args[3]), int(args[4])
+        if trials <= 0 or workers <= 0:
+            raise Exception("Invalid number of trials or number of workers")
+        sweepRunner(args[1], trials, workers, seed, args[5] if len(args) == 6 else CACHE_DIR)
+        return
     #Check number argument validity
-    if len(args) != 3:
-        print("Invalid number of arguments, " + str(len(args)) + " given, need 3")
+    if len(args) not in (3, 6):
+        print("Invalid number of arguments, " + str(len(args)) + " given, need 3 or 6")
         return
 
     dim = int(args[0])
@@ -35,119 +146,91 @@ def runner():
     if moving_target not in (0, 1):
         raise Exception("Moving Target should be 0/1")
 
-    if moving_target == 0: #Part 1
-        if count_movement == 0: #Rule 1 and Rule 2
-            start = time.time()
-            r1_actions = rule1(Board(dim))
-            end = time.time()
-            print(f"Rule 1 Actions: {r1_actions}")
-            print(f"Rule 1 Time: {end-start}")
-            
-            start = time.time()
-            r2_actions = rule2(Board(dim))
-            end = time.time()
-            print(f"Rule 2 Actions: {r2_actions}")
-            print(f"Rule 2 Time: {end-start}")
-
-        else: #Agent 1, Agent 2, Agent 3, and Improved Agent
-            start = time.time()
-            a1_actions = basicAgent1(Board(dim))
-            end = time.time()
-            print(f"Agent 1 Actions: {a1_actions}")
-            print(f"Agent 1 Time: {end-start}")
-
-            start = time.time()
-            a2_actions = basicAgent2(Board(dim))
-            end = time.time()
-            print(f"Agent 2 Actions: {a2_actions}")
-            print(f"Agent 2 Time: {end-start}")
-
-            start = time.time()
-            a3_actions = basicAgent3(Board(dim))
-            end = time.time()
-            print(f"Agent 3 Actions: {a3_actions}")
-            print(f"Agent 3 Time: {end-start}")
-
-            start = time.time()
-            a4_actions = improvedAgent(Board(dim))
-            end = time.time()
-            print(f"Improved Agent Actions: {a4_actions}")
-            print(f"Improved Agent Time: {end-start}")
-
-    else: #Part 2
-        if count_movement == 0: #Rule 1 and Rule 2
-            start = time.time()
-            r1_actions = rule1(Board(dim, moving_target=True), moving_target=True)
-            end = time.time()
-            print(f"Rule 1 Actions: {r1_actions}")
-            print(f"Rule 1 Time: {end-start}")
-
-            start = time.time()
-            mr1_actions = moveRule1(Board(dim, moving_target=True))
-            end = time.time()
-            print(f"Modifed Rule 1 Actions: {mr1_actions}")
-            print(f"Modifed Rule 1 Time: {end-start}")
-
-            start = time.time()
-            r2_actions = rule2(Board(dim, moving_target=True), moving_target=True)
-            end = time.time()
-            print(f"Rule 2 Actions: {r2_actions}")
-            print(f"Rule 2 Time: {end-start}")
-
-            start = time.time()
-            mr2_actions = moveRule2(Board(dim, moving_target=True))
-            end = time.time()
-            print(f"Modifed Rule 2 Actions: {mr2_actions}")
-            print(f"Modifed Rule 2 Time: {end-start}")
-
-        else: #Agent 1, Agent 2, Agent 3, and Improved Agent
-            start = time.time()
-            a1_actions = basicAgent1(Board(dim, moving_target=True), moving_target=True)
-            end = time.time()
-            print(f"Agent 1 Actions: {a1_actions}")
-            print(f"Agent 1 Time: {end-start}")
-
-            start = time.time()
-            ma1_actions = moveAgent1(Board(dim, moving_target=True))
-            end = time.time()
-            print(f"Modified Agent 1 Actions: {ma1_actions}")
-            print(f"Modified Agent 1 Time: {end-start}")
-
-            start = time.time()
-            a2_actions = basicAgent2(Board(dim, moving_target=True), moving_target=True)
-            end = time.time()
-            print(f"Agent 2 Actions: {a2_actions}")
-            print(f"Agent 2 Time: {end-start}")
-
-            start = time.time()
-            ma2_actions = moveAgent2(Board(dim, moving_target=True))
-            end = time.time()
-            print(f"Modified Agent 2 Actions: {ma2_actions}")
-            print(f"Modified Agent 2 Time: {end-start}")
-
-            start = time.time()
-            a3_actions = basicAgent3(Board(dim, moving_target=True), moving_target=True)
-            end = time.time()
-            print(f"Agent 3 Actions: {a3_actions}")
-            print(f"Agent 3 Time: {end-start}")
-
-            start = time.time()
-            ma3_actions = moveAgent3(Board(dim, moving_target=True))
-            end = time.time()
-            print(f"Modified Agent 3 Actions: {ma3_actions}")
-            print(f"Modified Agent 3 Time: {end-start}")
-
-            start = time.time()
-            a4_actions = improvedAgent(Board(dim, moving_target=True), moving_target=True)
-            end = time.time()
-            print(f"Improved Agent Actions: {a4_actions}")
-            print(f"Improved Agent Time: {end-start}")
-
-            start = time.time()
-            ma4_actions = moveImprovedAgent(Board(dim, moving_target=True))
-            end = time.time()
-            print(f"Modified Improved Agent Actions: {ma4_actions}")
-            print(f"Modified Improved Agent Time: {end-start}")
+    if len(args) == 6:
+        trials = int(args[3])
+        workers = int(args[4])
+        seed = int(args[5])
+        if trials <= 0:
+            raise Exception("Invalid number of trials")
+        if workers <= 0:
+            raise Exception("Invalid number of workers")
+        multiTrialRunner(dim, count_movement, moving_target, trials, workers, seed)
+        return
+
+    singleTrialRunner(dim, count_movement, moving_target)
+
+
+def singleTrialRunner(dim: int, count_movement: int, moving_target: int) -> None:
+    '''Run every agent of the selected group once on a fresh unseeded board and print its actions and time'''
+    for name in GROUPS[(moving_target, count_movement)]:
+        agent, board_kwargs, kwargs = AGENTS[name]
+        start = time.time()
+        actions = agent(Board(dim, **board_kwargs), **kwargs)
+        end = time.time()
+        print(f"{name} Actions: {actions}")
+        print(f"{name} Time: {end-start}")
+
+def multiTrialRunner(dim: int, count_movement: int, moving_target: int, trials: int, workers: int, seed: int) -> None:
+    '''Run every agent of the selected group for many trials and print aggregate statistics'''
+    for name in GROUPS[(moving_target, count_movement)]:
+        actions, times = runTrials(name, dim, trials, workers, seed)
+        print(formatSummary(f"{name} Actions", summarize(actions)))
+        print(formatSummary(f"{name} Time", summarize(times)))
+
+def replayRunner(path: str, count_movement: int, moving_target: int, workers: int) -> None:
+    '''Run every agent of the selected group on every scenario of a corpus and print aggregate statistics'''
+    #A compressed corpus is decompressed into shared memory once for every worker and agent, a directory corpus is
+    #memory mapped so workers share its pages without a copy
+    shared = openCorpus(path).share() if workers > 1 and path.endswith(".npz") else None
+    try:
+        for name in GROUPS[(moving_target, count_movement)]:
+            actions, times = runCorpus(name, path, workers, None if shared is None else shared.spec)
+            print(formatSummary(f"{name} Actions", summarize(actions)))
+            print(formatSummary(f"{name} Time", summarize(times)))
+    finally:
+        if shared is not None:
+            shared.close()
+
+def adaptiveRunner(names: list, dim: int, workers: int, seed: int, precision) -> None:
+    '''Compare agents with paired trials until the comparison is clear, and print the estimates and differences'''
+    for name in names:
+        if name not in AGENTS:
+            raise Exception(f"Unknown agent {name}, choose from: {', '.join(AGENTS)}")
+    result = sequentialTrials(names, dim, workers, seed, precision)
+    print(f"Stopped after {result['trials']} paired trials ({result['reason']})")
+    for name, stats in result["agents"].items():
+        print(formatSummary(f"{name} Actions", stats.summary()))
+    for (first, second), stats in result["differences"].items():
+        half_width = stats.halfWidth(result["z"])
+        print(f"{first} - {second}: mean={stats.mean:.4g} ({stats.mean-half_width:.4g} - {stats.mean+half_width:.4g})")
+
+def teamRunner(team_sizes: list, rule: str, dim: int, trials: int, workers: int, seed: int) -> None:
+    '''Print how the actions of a team scale with the number of searchers'''
+    results = teamScaling(team_sizes, rule, dim, trials, workers, seed)
+    base = results[team_sizes[0]]["wall"]
+    print(f"{'Searchers':>10}{'Total Actions':>16}{'Wall Actions':>14}{'Speedup':>10}{'Time':>10}")
+    for searchers, result in results.items():
+        print(f"{searchers:>10}{result['total']:>16.1f}{result['wall']:>14.1f}{base/result['wall']:>10.2f}{result['seconds']:>10.3f}")
+
+def recordRunner(name: str, dim: int, seed: int, path: str) -> None:
+    '''Record one run of an agent and save it'''
+    if name not in AGENTS:
+        raise Exception(f"Unknown agent {name}, choose from: {', '.join(AGENTS)}")
+    agent, board_kwargs, kwargs = AGENTS[name]
+    recorder = Recorder()
+    actions = agent(Board(dim, rng=seed, **board_kwargs), probe=recorder, **kwargs)
+    recorder.save(path)
+    print(f"{name} Actions: {actions} in {len(recorder.steps)} steps, recorded to {path}")
+
+def sweepRunner(path: str, trials: int, workers: int, seed: int, cache_dir: str) -> None:
+    '''Run a sweep described by a JSON file and print the statistics of every configuration'''
+    with open(path) as spec_file:
+        spec = json.load(spec_file)
+    axes = spec.get("grid", {})
+    results = sweep(grid(spec.get("base", {}), axes), trials, workers, seed, cache_dir)
+    for config, actions, _, computed in results:
+        label = ", ".join(f"{key}={json.dumps(config[key])}" for key in axes) or config["agent"]
+        print(formatSummary(f"{label} Actions", summarize(actions)) + f" ({computed} of {trials} trials run)")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,21 @@
+'''Distance tables stay in the requested dtype whatever integer type the position has'''
+
+import numpy as np
+import pytest
+
+import Diamond
+from Board import Board
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64, np.int32])
+@pytest.mark.parametrize("pos", [(3, 4), (np.int64(3), np.int64(4)), (np.intp(3), np.int32(4)), np.array([3, 4])])
+def test_distances_dtype(dtype, pos):
+    distance = Diamond.distances(8, pos, dtype)
+    assert distance.dtype == dtype
+    assert distance[3, 4] == 0 and distance[0, 0] == 7
+
+def test_compact_distance_mask_dtype():
+    board = Board(16, storage="compact", rng=0)
+    pos = np.unravel_index(np.int64(37), (16, 16)) #NumPy integers, as the argmax helpers return them
+    assert Diamond.distances(board.dim, pos, board.board.dtype).dtype == np.float32
+    assert board.bestDistNumpy(pos) == board.bestDistNumpy((int(pos[0]), int(pos[1])))